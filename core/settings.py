@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "crm_api.middleware.CompressionMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +75,33 @@ DATABASES = {
 }
 
 
+# Кэш для phone_index, статистики, проверок токенов и прав. Он должен быть общим для всех воркеров:
+# на нём держатся поколения/версии и флаги отключения (crm_api.services.tokens.cache_is_shared),
+# с кэшем процесса (LocMem) эти оптимизации выключаются. По умолчанию — файловый кэш на хосте;
+# если воркеры на нескольких хостах, задайте CRM_REDIS_URL (нужен пакет redis).
+# набор прав пользователя кэшируется между запросами (см. crm_api.backends)
+AUTHENTICATION_BACKENDS = ["crm_api.backends.CachedModelBackend"]
+
+CACHE_DIR = BASE_DIR / "cache"
+CRM_REDIS_URL = os.environ.get("CRM_REDIS_URL")
+
+if CRM_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CRM_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(CACHE_DIR),
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -120,9 +148,9 @@ AUTH_USER_MODEL = "crm_api.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "crm_api.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication" if DEBUG else
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "crm_api.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -132,10 +160,18 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "crm_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 50,
 }
 
+# crm_api.middleware.CompressionMiddleware: короче порога не сжимаем; br 4 — быстро для динамики
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -155,6 +191,10 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "ALGORITHM": "HS256",
     "UPDATE_LAST_LOGIN": True,
+    # username/role/fio/is_staff в токене — ClaimsJWTAuthentication не ходит за пользователем на GET
+    "TOKEN_OBTAIN_SERIALIZER": "crm_api.auth.MyTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "crm_api.auth.CrmTokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "crm_api.authentication.CrmTokenUser",
 }
 
 
@@ -164,6 +204,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 RUNLOGS_DIR = BASE_DIR / "runlogs"
 RUNLOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+# снимки для аналитики (manage.py build_analytics_snapshot)
+ANALYTICS_DIR = BASE_DIR / "analytics"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
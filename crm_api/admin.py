@@ -7,6 +7,7 @@ from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.urls import path
@@ -17,6 +18,7 @@ from django.utils.html import format_html
 from .models import *
 from .services.excel_importer import *
 from crm_api.services.users import bulk_create_operators, build_csv_from_results
+from crm_api.services import operator_stats
 
 
 BASE_LIST_DISPLAY = (
@@ -204,6 +206,20 @@ class UploadJobAdmin(admin.ModelAdmin):
 
 
 
+@admin.register(MoveJob)
+class MoveJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "moved_rows", "total_rows", "last_pk", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = (
+        "status", "last_pk", "total_rows", "moved_rows", "last_error",
+        "created_by", "created_at", "updated_at", "finished_at",
+    )
+    ordering = ("-id",)
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Fixeds)
 class FixedsAdmin(admin.ModelAdmin):
     list_display = (
@@ -215,5 +231,12 @@ class FixedsAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at", "updated_at", "moved_at")
     ordering = ("-moved_at",)
 
+    def delete_queryset(self, request, queryset):
+        # массовое удаление идёт мимо Fixeds.delete() — свёртку правим здесь же
+        with transaction.atomic():
+            rows = queryset.only("fixed_by", "fixed_at", "status_call", "call_result")
+            operator_stats.record((operator_stats.key_of(f) for f in rows), sign=-1)
+            queryset.delete()
+
 
 
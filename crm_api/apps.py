@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class CrmApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "crm_api"
+
+    def ready(self):
+        from crm_api import signals  # noqa: F401
@@ -1,18 +1,72 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+def apply_user_claims(token, user):
+    """Claims, по которым ClaimsJWTAuthentication собирает пользователя без запроса в БД."""
+    token["username"] = user.username
+    token["role"] = getattr(user, "role", "")
+    token["fio"] = getattr(user, "fio", "") or ""
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    return token
+
+
+class CrmRefreshToken(RefreshToken):
+    """Проверка блэклиста через индекс в памяти процесса вместо JOIN-запроса на каждый refresh."""
+
+    def check_blacklist(self):
+        from crm_api.services.tokens import is_blacklisted
+
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class CrmTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Как TokenRefreshSerializer, но claims нового access (и ротированного refresh) берутся из БД:
+    снятые is_staff/is_superuser/роль не должны жить до конца срока refresh-токена.
+    """
+
+    token_class = CrmRefreshToken
+
+    def validate(self, attrs):
+        from crm_api.services.tokens import maybe_prune_in_background
+
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        apply_user_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+
+        maybe_prune_in_background()
+        return data
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CrmRefreshToken
+
     @classmethod
     def get_token(cls, user):
-        token = super().get_token(user)
-        token["username"] = user.username
-        token["role"] = getattr(user, "role", "")
-        token["fio"] = getattr(user, "fio", "") or ""
-        return token
+        return apply_user_claims(super().get_token(user), user)
 
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -50,7 +104,7 @@ class LogoutView(APIView):
         if not refresh:
             return Response({"detail": "refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh)
+            token = CrmRefreshToken(refresh)
             token.blacklist()
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
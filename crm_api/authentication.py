@@ -0,0 +1,75 @@
+# crm_api/authentication.py
+# отдельно от auth.py: модуль грузится из REST_FRAMEWORK при импорте DRF и не должен тянуть views
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+# claims, без которых пользователя из токена не собрать (токены, выданные до их появления)
+USER_CLAIMS = ("username", "role", "is_staff", "is_superuser")
+
+
+class CrmTokenUser(TokenUser):
+    """
+    Пользователь из claims access-токена, без запроса в БД.
+    Superuser и пустой список прав (DjangoModelPermissions на GET) отвечаются по claims;
+    остальные проверки прав — через настоящего User, который подгружается только при первой из них.
+    Активность по claims не видна: отключённых отсекает ClaimsJWTAuthentication.
+    """
+
+    @property
+    def role(self) -> str:
+        return self.token.get("role", "")
+
+    @property
+    def fio(self) -> str:
+        return self.token.get("fio", "")
+
+    def get_full_name(self) -> str:
+        return self.fio
+
+    @cached_property
+    def user(self):
+        from crm_api.models import User
+
+        return User.objects.get(pk=self.pk)
+
+    def get_group_permissions(self, obj=None) -> set:
+        return self.user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None) -> set:
+        return self.user.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None) -> bool:
+        return self.is_superuser or self.user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None) -> bool:
+        perm_list = list(perm_list)
+        return not perm_list or self.is_superuser or self.user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module) -> bool:
+        return self.is_superuser or self.user.has_module_perms(module)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Для безопасных методов (GET/HEAD/OPTIONS) — CrmTokenUser из claims, без SELECT пользователя.
+    Запросы на запись получают полноценного User: его присваивают в FK (fixed_by, claimed_by, created_by).
+    Без общего кэша отключение пользователя другим воркером не видно — тогда тоже User из БД.
+    """
+
+    def authenticate(self, request):
+        self._stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        from crm_api.services.tokens import cache_is_shared, is_user_disabled
+
+        if not self._stateless or not cache_is_shared() or any(c not in validated_token for c in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        user = CrmTokenUser(validated_token)
+        if is_user_disabled(user.pk):
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
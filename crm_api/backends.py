@@ -0,0 +1,41 @@
+# crm_api/backends.py
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from crm_api.services.tokens import bump_version, cache_is_shared
+
+PERMISSIONS_VERSION_KEY = "crm:perms:version"
+PERMISSIONS_TTL = 60 * 60
+
+
+def _user_version_key(user_id) -> str:
+    return f"crm:perms:user:{user_id}:v"
+
+
+def bump_permissions_version(user_id=None):
+    """user_id=None — изменились группы/права целиком: сбрасываются кэши всех пользователей."""
+    bump_version(PERMISSIONS_VERSION_KEY if user_id is None else _user_version_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend с кэшем набора прав между запросами: ключ — user id + версия прав
+    (глобальная и пользователя). Версии поднимают сигналы на изменения групп и прав (crm_api.signals).
+    Кэш процесса (LocMem) другие воркеры не сбрасывают — на нём права кэшируются только в пределах запроса.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not cache_is_shared():
+            return super().get_all_permissions(user_obj, obj)
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            version_keys = [PERMISSIONS_VERSION_KEY, _user_version_key(user_obj.pk)]
+            versions = cache.get_many(version_keys)
+            key = f"crm:perms:{user_obj.pk}:" + ":".join(str(versions.get(k, 0)) for k in version_keys)
+            perms = cache.get(key)
+            if perms is None:
+                perms = super().get_all_permissions(user_obj)
+                cache.set(key, perms, PERMISSIONS_TTL)
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
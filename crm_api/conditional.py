@@ -0,0 +1,57 @@
+# crm_api/conditional.py
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def _etag(request, *state) -> str:
+    """Слабый ETag: путь с query string, формат ответа и состояние данных."""
+    raw = repr((request.get_full_path(), request.accepted_renderer.format, *state))
+    return 'W/"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def list_etag(request, qs) -> str:
+    """Отпечаток отфильтрованной выборки одним агрегатом: count + max(updated_at) + max(pk)."""
+    state = qs.order_by().aggregate(n=Count("pk"), updated=Max("updated_at"), last=Max("pk"))
+    return _etag(request, state["n"], state["updated"], state["last"])
+
+
+def row_etag(request, qs, pk) -> str | None:
+    """ETag записи по её updated_at; None — записи нет или updated_at пуст (тогда без кэша)."""
+    try:
+        updated_at = qs.filter(pk=pk).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError):
+        return None  # кривой pk — пусть get_object ответит 404
+    return _etag(request, pk, updated_at) if updated_at else None
+
+
+def _mark(response, etag):
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(request, etag, build):
+    """304 по If-None-Match до вызова build(); иначе ответ build() с ETag."""
+    if etag is None:
+        return build()
+    not_modified = get_conditional_response(request, etag=etag, response=_mark(HttpResponse(), etag))
+    if not_modified.status_code != 200:
+        return not_modified
+    response = build()
+    return _mark(response, etag) if response.status_code == 200 else response
+
+
+class ConditionalGetMixin:
+    """ETag/304 для list и retrieve: при совпадении ничего не сериализуется."""
+
+    def list(self, request, *args, **kwargs):
+        etag = list_etag(request, self.filter_queryset(self.get_queryset()))
+        return conditional(request, etag, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        etag = row_etag(request, self.filter_queryset(self.get_queryset()), pk)
+        return conditional(request, etag, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
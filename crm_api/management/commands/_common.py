@@ -0,0 +1,13 @@
+# общее для команд, которые вызывают view от имени пользователя (имя с "_" — не команда)
+from django.core.management.base import CommandError
+
+from crm_api.models import User
+
+
+def get_request_user(username=None) -> User:
+    """Пользователь по --user; по умолчанию первый superuser."""
+    qs = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+    user = qs.order_by("pk").first()
+    if not user:
+        raise CommandError("User not found: pass --user or create a superuser.")
+    return user
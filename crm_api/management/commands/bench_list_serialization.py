@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from crm_api.models import Actives, Fixeds
+from crm_api.renderers import FastJSONRenderer, orjson
+from crm_api.serializers import ACTIVES_ROWS, FIXEDS_ROWS, ActivesSerializer, FixedsSerializer
+
+# (метка, queryset, сериализатор, RowMapper) — те же, что у list во viewset'ах
+TARGETS = [
+    ("actives", lambda: Actives.objects.select_related("fixed_by").order_by("-created_at"),
+     ActivesSerializer, ACTIVES_ROWS),
+    ("fixeds", lambda: Fixeds.objects.select_related("fixed_by").order_by("-fixed_at"),
+     FixedsSerializer, FIXEDS_ROWS),
+]
+
+
+class Command(BaseCommand):
+    help = "Сравнивает list через ModelSerializer и через values() + RowMapper (запрос, сериализация, JSON)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="строк на страницу (max_page_size = 500)")
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        rows, iterations = opts["rows"], opts["iterations"]
+        self.stdout.write(f"orjson: {'yes' if orjson else 'no (fallback to json)'}")
+        for label, make_qs, serializer_class, mapper in TARGETS:
+            slow = serializer_class(make_qs()[:rows], many=True).data
+            fast = mapper.map(mapper.values(make_qs())[:rows])
+            if not fast:
+                self.stdout.write(f"{label}: нет данных, пропускаю")
+                continue
+            if JSONRenderer().render(slow) != JSONRenderer().render(fast):
+                raise CommandError(f"{label}: выдача RowMapper отличается от {serializer_class.__name__}")
+
+            self._report(f"{label} serializer", iterations, lambda: JSONRenderer().render(
+                serializer_class(make_qs()[:rows], many=True).data))
+            self._report(f"{label} values", iterations, lambda: JSONRenderer().render(
+                mapper.map(mapper.values(make_qs())[:rows])))
+            self._report(f"{label} values+fast", iterations, lambda: FastJSONRenderer().render(
+                mapper.map(mapper.values(make_qs())[:rows])))
+            self.stdout.write(f"{label}: {len(fast)} rows")
+
+    def _report(self, label, iterations, run):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{label:>22}: p50={statistics.median(timings):.2f}ms "
+            f"p95={timings[max(int(len(timings) * 0.95) - 1, 0)]:.2f}ms"
+        )
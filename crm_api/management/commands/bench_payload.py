@@ -0,0 +1,55 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from crm_api import views
+from crm_api.middleware import CompressionMiddleware, brotli
+from crm_api.management.commands._common import get_request_user
+from crm_api.renderers import FastJSONRenderer, orjson
+
+# (метка, view, actions, путь) — страницы, которые грид запрашивает чаще всего
+ENDPOINTS = [
+    ("actives list", views.ActivesViewSet, {"get": "list"}, "/api/actives/"),
+    ("suspends list", views.SuspendsViewSet, {"get": "list"}, "/api/suspends/"),
+    ("fixeds list", views.FixedsViewSet, {"get": "list"}, "/api/fixeds/"),
+    ("search all", views.SearchSuspendsFixeds, None, "/api/search-all/"),
+]
+ENCODINGS = ["identity", "gzip"] + (["br"] if brotli else [])
+
+
+class Command(BaseCommand):
+    help = "Размер и время ответа списков: JSON-рендерер (стандартный / быстрый) x сжатие (identity / gzip / br)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="username, от имени которого вызывать view (по умолчанию первый superuser)")
+        parser.add_argument("--page-size", type=int, default=500)
+        parser.add_argument("--iterations", type=int, default=10)
+
+    def handle(self, *args, **opts):
+        user = get_request_user(opts.get("user"))
+        factory = APIRequestFactory()
+        self.stdout.write(f"orjson: {'yes' if orjson else 'no'}, brotli: {'yes' if brotli else 'no'}")
+
+        for renderer in (JSONRenderer, FastJSONRenderer):
+            for label, view_class, actions, path in ENDPOINTS:
+                if actions:
+                    view = view_class.as_view(actions, renderer_classes=[renderer])
+                else:
+                    view = view_class.as_view(renderer_classes=[renderer])
+                for encoding in ENCODINGS:
+                    middleware = CompressionMiddleware(lambda request, view=view: view(request).render())
+                    response, timings = None, []
+                    for _ in range(opts["iterations"]):
+                        request = factory.get(path, {"page_size": opts["page_size"]}, HTTP_ACCEPT_ENCODING=encoding)
+                        force_authenticate(request, user=user)
+                        started = time.perf_counter()
+                        response = middleware(request)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    self.stdout.write(
+                        f"{renderer.__name__:>16} {label:>14} {encoding:>8}: "
+                        f"{len(response.content):>9} bytes  p50={statistics.median(timings):.2f}ms"
+                    )
+
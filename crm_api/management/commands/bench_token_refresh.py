@@ -0,0 +1,67 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from crm_api.auth import CrmRefreshToken, CrmTokenRefreshSerializer
+from crm_api.models import User
+from crm_api.services.tokens import prune_expired_tokens
+
+BENCH_USERNAME = "__bench_tokens__"
+
+
+class Command(BaseCommand):
+    help = "Латентность refresh при растущей истории token_blacklist (до и после чистки)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--history", default="0,10000,100000",
+                            help="размеры истории (истёкшие + отозванные токены) через запятую")
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={"is_active": True})
+        try:
+            seeded = 0
+            for size in (int(x) for x in opts["history"].split(",")):
+                seeded += self._seed(user, size - seeded)
+                self._report(f"history={size}", user, opts["iterations"])
+            prune_expired_tokens()
+            self._report("after prune", user, opts["iterations"])
+        finally:
+            OutstandingToken.objects.filter(user=user).delete()
+            user.delete()
+
+    def _seed(self, user, count):
+        """Истёкшие outstanding-токены, каждый второй — в блэклисте."""
+        if count <= 0:
+            return 0
+        past = aware_utcnow() - timedelta(days=1)
+        for start in range(0, count, 5000):
+            batch = [
+                OutstandingToken(user=user, jti=uuid.uuid4().hex, token="", created_at=past, expires_at=past)
+                for _ in range(min(5000, count - start))
+            ]
+            OutstandingToken.objects.bulk_create(batch)
+            created = OutstandingToken.objects.filter(jti__in=[t.jti for t in batch[::2]])
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=t) for t in created])
+        return count
+
+    def _report(self, label, user, iterations):
+        refresh = str(CrmRefreshToken.for_user(user))
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            serializer = CrmTokenRefreshSerializer(data={"refresh": refresh})
+            serializer.is_valid(raise_exception=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            refresh = serializer.validated_data.get("refresh", refresh)
+        timings.sort()
+        self.stdout.write(
+            f"{label:>16}: p50={statistics.median(timings):.2f}ms "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms "
+            f"outstanding={OutstandingToken.objects.count()} blacklisted={BlacklistedToken.objects.count()}"
+        )
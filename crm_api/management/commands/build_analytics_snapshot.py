@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crm_api.services.analytics import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Снимок Fixeds + исходы по Actives для аналитики воронки (запускать ночью по cron)."
+
+    def handle(self, *args, **opts):
+        df = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(f"{len(df)} rows -> {snapshot_path()}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm_api import views
+from crm_api.management.commands._common import get_request_user
+from crm_api.testing import page_query_counts
+
+# (метка, view, путь) — списки, число запросов которых не должно зависеть от размера страницы
+LIST_ENDPOINTS = [
+    ("actives list", views.ActivesViewSet.as_view({"get": "list"}), "/api/actives/"),
+    ("suspends list", views.SuspendsViewSet.as_view({"get": "list"}), "/api/suspends/"),
+    ("fixeds list", views.FixedsViewSet.as_view({"get": "list"}), "/api/fixeds/"),
+    ("search all", views.SearchSuspendsFixeds.as_view(), "/api/search-all/"),
+]
+PAGE_SIZES = (1, 500)
+
+
+class Command(BaseCommand):
+    help = "Проверяет, что число SQL-запросов списков не растёт с размером страницы (нет N+1)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="username, от имени которого вызывать view (по умолчанию первый superuser)")
+
+    def handle(self, *args, **opts):
+        user = get_request_user(opts.get("user"))
+        failed = []
+        for label, view, path in LIST_ENDPOINTS:
+            counts = page_query_counts(view, path, user, PAGE_SIZES)
+            ok = len(set(counts)) == 1
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f"{label}: " + ", ".join(f"page_size={s} -> {c}" for s, c in zip(PAGE_SIZES, counts))))
+            if not ok:
+                failed.append(label)
+        if failed:
+            raise CommandError(f"Query count depends on page size: {', '.join(failed)}")
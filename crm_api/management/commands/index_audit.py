@@ -0,0 +1,177 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from crm_api import views
+from crm_api.management.commands._common import get_request_user
+from crm_api.models import Actives, Fixeds, Suspends
+
+SAMPLE_NUMBER = "998901234567"
+
+# (метка, view, путь, query params) — те же запросы, что шлёт фронт
+VIEW_REQUESTS = [
+    ("suspends list", views.SuspendsViewSet.as_view({"get": "list"}), "/api/suspends/", {}),
+    ("actives list", views.ActivesViewSet.as_view({"get": "list"}), "/api/actives/", {}),
+    ("actives by status", views.ActivesViewSet.as_view({"get": "list"}), "/api/actives/", {"status": "active"}),
+    ("fixeds list", views.FixedsViewSet.as_view({"get": "list"}), "/api/fixeds/", {}),
+    ("search by number", views.SearchSuspendsFixeds.as_view(), "/api/search-all/", {"q": SAMPLE_NUMBER}),
+    ("stats general", views.OperatorStatisticsAPIView.as_view(), "/api/stats/general/", {}),
+    ("stats daily", views.OperatorDailyStatsAPIView.as_view(), "/api/stats/daily/", {}),
+]
+
+
+def _queryset_shapes():
+    """Запросы выгрузок/переноса/resolve: только SQL, без выполнения тяжёлых view."""
+    now = timezone.now()
+    return [
+        ("export fixeds daily",
+         Fixeds.objects.filter(fixed_at__gte=now - timedelta(days=1), fixed_at__lt=now).order_by("fixed_at", "id")),
+        ("export suspends", Suspends.objects.all()),
+        ("move suspends", Suspends.objects.exclude(status_call__isnull=True).exclude(status_call="").order_by("pk")),
+        ("resolve msisdn", Suspends.objects.filter(phone_norm=SAMPLE_NUMBER).order_by("pk")[:1]),
+    ]
+
+
+_FROM_RE = re.compile(r'\bFROM\s+[`"]?(\w+)[`"]?', re.I)
+_WHERE_RE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", re.I | re.S)
+_ORDER_RE = re.compile(r"\bORDER BY\b(.*?)(?:\bLIMIT\b|$)", re.I | re.S)
+_COND_RE = re.compile(
+    r'[`"]?(\w+)[`"]?\.[`"]?(\w+)[`"]?\s*(<>|>=|<=|=|<|>|\bIN\b|\bLIKE\b|\bIS\b|\bBETWEEN\b)', re.I
+)
+_COL_RE = re.compile(r'[`"]?(\w+)[`"]?\.[`"]?(\w+)[`"]?')
+_RANGE_OPS = {">=", "<=", "<", ">", "BETWEEN"}
+
+
+class QueryShape:
+    def __init__(self, label, sql, params):
+        self.label = label
+        self.sql = sql
+        self.params = params
+        m = _FROM_RE.search(sql)
+        self.table = m.group(1) if m else ""
+        self.equality, self.range, self.order = [], [], []
+
+        where = _WHERE_RE.search(sql)
+        for table, col, op in _COND_RE.findall(where.group(1) if where else ""):
+            if table != self.table:
+                continue
+            op = op.upper()
+            if op in ("=", "IN", "IS"):
+                target = self.equality
+            elif op in _RANGE_OPS:
+                target = self.range
+            else:
+                continue  # LIKE '%..%' и <> индекс не используют
+            if col not in target:
+                target.append(col)
+
+        order = _ORDER_RE.search(sql)
+        for table, col in _COL_RE.findall(order.group(1) if order else ""):
+            if table == self.table and col not in self.order:
+                self.order.append(col)
+
+    @property
+    def columns(self):
+        return set(self.equality) | set(self.range) | set(self.order)
+
+    def proposed_index(self, pk_column="id"):
+        """Равенства -> первый диапазон -> сортировка (PK InnoDB добавляет к индексу сам)."""
+        cols = [c for c in self.equality if c not in self.range]
+        if self.range:
+            cols.append(self.range[0])
+            cols += [c for c in self.order[:1] if c == self.range[0] and c not in cols]
+        else:
+            cols += [c for c in self.order if c not in cols]
+        while cols and cols[-1] == pk_column:
+            cols.pop()
+        return cols
+
+
+class Command(BaseCommand):
+    help = "Записывает SQL, который шлют view, делает EXPLAIN и предлагает составные индексы."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="username, от имени которого вызывать view (по умолчанию первый superuser)")
+        parser.add_argument("--no-explain", action="store_true", help="не выполнять EXPLAIN")
+
+    def handle(self, *args, **opts):
+        user = get_request_user(opts.get("user"))
+        shapes = self._record_view_queries(user)
+        for label, qs in _queryset_shapes():
+            sql, params = qs.query.sql_with_params()
+            shapes.append(QueryShape(label, sql, params))
+
+        audited_tables = {Actives._meta.db_table, Fixeds._meta.db_table}
+        shapes = [s for s in shapes if s.table in audited_tables]
+        used_keys = set()
+
+        with connection.cursor() as cursor:
+            indexes = {t: self._indexes(cursor, t) for t in audited_tables}
+            for shape in shapes:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"[{shape.label}] {shape.table}"))
+                self.stdout.write(f"  where=: {shape.equality}  range: {shape.range}  order: {shape.order}")
+                if not opts["no_explain"]:
+                    for row in self._explain(cursor, shape):
+                        used_keys.add(row.get("key"))
+                        self.stdout.write(
+                            f"  explain: type={row.get('type')} key={row.get('key')} "
+                            f"rows={row.get('rows')} extra={row.get('Extra') or ''}"
+                        )
+                proposal = shape.proposed_index()
+                if proposal and not self._covered(proposal, indexes[shape.table]):
+                    self.stdout.write(self.style.WARNING(f"  propose: models.Index(fields={proposal})"))
+
+            self.stdout.write(self.style.MIGRATE_HEADING("Unused indexes"))
+            used_columns = {(s.table, c) for s in shapes for c in s.columns}
+            for table, idx in indexes.items():
+                fk_columns = self._fk_columns(cursor, table)
+                for name, cols in idx.items():
+                    if name in used_keys or (table, cols[0]) in used_columns:
+                        continue
+                    if len(cols) == 1 and cols[0] in fk_columns:
+                        continue  # InnoDB требует индекс под FK
+                    self.stdout.write(f"  {table}.{name} {cols}")
+
+    def _record_view_queries(self, user):
+        recorded = []
+        factory = APIRequestFactory()
+
+        def recorder(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith("SELECT"):
+                recorded.append((current, sql, params))
+            return execute(sql, params, many, context)
+
+        with transaction.atomic(), connection.execute_wrapper(recorder):
+            for current, view, path, params in VIEW_REQUESTS:
+                request = factory.get(path, params)
+                force_authenticate(request, user=user)
+                view(request).render()
+            transaction.set_rollback(True)
+
+        return [QueryShape(label, sql, params) for label, sql, params in recorded]
+
+    def _indexes(self, cursor, table):
+        constraints = connection.introspection.get_constraints(cursor, table)
+        return {
+            name: c["columns"]
+            for name, c in constraints.items()
+            if c["index"] and not c["primary_key"] and c["columns"]
+        }
+
+    def _fk_columns(self, cursor, table):
+        constraints = connection.introspection.get_constraints(cursor, table)
+        return {c["columns"][0] for c in constraints.values() if c["foreign_key"]}
+
+    @staticmethod
+    def _covered(proposal, indexes):
+        return any(cols[:len(proposal)] == proposal for cols in indexes.values())
+
+    @staticmethod
+    def _explain(cursor, shape):
+        cursor.execute(f"EXPLAIN {shape.sql}", shape.params)
+        names = [c[0] for c in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crm_api.services.operator_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает свёртку OperatorDailyStat по Fixeds с нуля."
+
+    def handle(self, *args, **opts):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"OperatorDailyStat: {rows} rows"))
@@ -0,0 +1,105 @@
+# crm_api/middleware.py
+import re
+import secrets
+import zlib
+from gzip import GzipFile
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import StreamingBuffer, compress_string
+
+try:
+    import brotli
+except ImportError:  # brotli — опциональная зависимость, без неё только gzip
+    brotli = None
+
+_ACCEPTS_BR = re.compile(r"\bbr\b")
+_ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+# xlsx — уже zip, картинки/архивы тоже: повторно не жмём
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def _gzip_sequence(sequence, max_random_bytes: int):
+    """
+    Как django.utils.text.compress_sequence (случайное имя в заголовке против BREACH),
+    но с Z_SYNC_FLUSH после каждого чанка: иначе zlib копит вывод, пока не заполнит окно.
+    """
+    buf = StreamingBuffer()
+    filename = b"a" * secrets.randbelow(max_random_bytes) if max_random_bytes else None
+    with GzipFile(filename=filename, mode="wb", compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        for chunk in sequence:
+            zfile.write(chunk)
+            zfile.flush(zlib.Z_SYNC_FLUSH)
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
+
+
+def _br_sequence(sequence, quality: int):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    gzip/brotli для API и выгрузок: br — если установлен brotli и клиент его принимает, иначе gzip.
+    Ответы короче COMPRESSION_MIN_SIZE не сжимаются; стримы сжимаются по чанкам (с flush),
+    чтобы клиент получал данные по мере генерации.
+    """
+    max_random_bytes = 100  # как в GZipMiddleware: маскировка длины (BREACH)
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.brotli_quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4)
+
+    def _encoding(self, request) -> str | None:
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is not None and _ACCEPTS_BR.search(accept):
+            return "br"
+        if _ACCEPTS_GZIP.search(accept):
+            return "gzip"
+        return None
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code == 304:
+            return response
+        if not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self._encoding(request)
+        if encoding is None or (response.streaming and response.is_async):
+            return response
+
+        if response.streaming:
+            if encoding == "br":
+                response.streaming_content = _br_sequence(response.streaming_content, self.brotli_quality)
+            else:
+                response.streaming_content = _gzip_sequence(response.streaming_content, self.max_random_bytes)
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=self.brotli_quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
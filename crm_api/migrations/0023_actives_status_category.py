@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_status_category(apps, schema_editor):
+    Actives = apps.get_model("crm_api", "Actives")
+    suspend = Q(status__icontains="susp") | Q(status__icontains="приостан")
+    active = Q(status__icontains="activ") | Q(status__icontains="актив") | Q(status__icontains="включ")
+    Actives.objects.filter(active).exclude(suspend).update(status_category="active")
+    Actives.objects.filter(suspend).update(status_category="suspend")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0022_actives_address_fixeds_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actives',
+            name='status_category',
+            field=models.CharField(choices=[('suspend', 'Suspend'), ('active', 'Active'), ('other', 'Other')], default='other', editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['status_category'], name='crm_api_act_status__4427ce_idx'),
+        ),
+        migrations.RunPython(backfill_status_category, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:30
+
+import pandas as pd
+from django.db import migrations, models
+
+from crm_api.services.phones import normalize_phone_series
+
+BACKFILL_CHUNK = 5000
+
+
+def _backfill(model):
+    last_pk = 0
+    while True:
+        rows = list(
+            model.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "msisdn", "phone")[:BACKFILL_CHUNK]
+        )
+        if not rows:
+            break
+        df = pd.DataFrame(rows, columns=["pk", "msisdn", "phone"])
+        df["msisdn_norm"] = normalize_phone_series(df["msisdn"])
+        df["phone_norm"] = normalize_phone_series(df["phone"])
+        objs = [
+            model(pk=pk, msisdn_norm=m, phone_norm=p)
+            for pk, m, p in df[["pk", "msisdn_norm", "phone_norm"]].itertuples(index=False)
+        ]
+        model.objects.bulk_update(objs, ["msisdn_norm", "phone_norm"], batch_size=1000)
+        last_pk = rows[-1][0]
+
+
+def backfill_normalized_numbers(apps, schema_editor):
+    _backfill(apps.get_model("crm_api", "Actives"))
+    _backfill(apps.get_model("crm_api", "Fixeds"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0023_actives_status_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actives',
+            name='msisdn_norm',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='actives',
+            name='phone_norm',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='fixeds',
+            name='msisdn_norm',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='fixeds',
+            name='phone_norm',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['msisdn_norm'], name='crm_api_act_msisdn__dc67ac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['phone_norm'], name='crm_api_act_phone_n_caa55b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['msisdn_norm'], name='crm_api_fix_msisdn__b5ee78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['phone_norm'], name='crm_api_fix_phone_n_dfedb8_idx'),
+        ),
+        migrations.RunPython(backfill_normalized_numbers, migrations.RunPython.noop),
+    ]
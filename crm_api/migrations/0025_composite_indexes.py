@@ -0,0 +1,109 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0024_actives_msisdn_norm_actives_phone_norm_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['account'], name='crm_api_act_account_127d2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['created_at'], name='crm_api_act_created_e068eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['status_category', 'created_at'], name='crm_api_act_status__b1a210_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actives',
+            index=models.Index(fields=['status_category', 'status_call'], name='crm_api_act_status__630f5e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['fixed_by', 'fixed_at'], name='crm_api_fix_fixed_b_45e46a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['msisdn', 'fixed_at'], name='crm_api_fix_msisdn_d569c6_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_branche_beeb0b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_rate_pl_da50b9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_status_94d251_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_status__4427ce_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_status__858135_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_call_re_117da1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_abonent_7cacb2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='actives',
+            name='crm_api_act_tech_1f6879_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_msisdn_f9ac0b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_phone_b4b967_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_branche_431812_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_rate_pl_31ca1b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_status_bd267b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_status__7978d0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_call_re_dabbfd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_abonent_938492_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_tech_b5270c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_fixed_b_fa38fa_idx',
+        ),
+    ]
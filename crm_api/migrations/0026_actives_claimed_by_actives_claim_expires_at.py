@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0025_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actives',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claims', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='actives',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:10
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+UNDATED = datetime.date(1970, 1, 1)
+
+
+def fill_operator_stats(apps, schema_editor):
+    Fixeds = apps.get_model("crm_api", "Fixeds")
+    OperatorDailyStat = apps.get_model("crm_api", "OperatorDailyStat")
+
+    rows = (
+        Fixeds.objects.exclude(fixed_by__isnull=True)
+        .annotate(day=TruncDate("fixed_at"))
+        .values("fixed_by_id", "day", "status_call", "call_result")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    merged = {}
+    for r in rows.iterator(chunk_size=5000):
+        key = (r["fixed_by_id"], r["day"] or UNDATED, r["status_call"] or "", r["call_result"] or "")
+        merged[key] = merged.get(key, 0) + r["n"]
+
+    OperatorDailyStat.objects.bulk_create(
+        [
+            OperatorDailyStat(user_id=u, day=d, status_call=sc, call_result=cr, count=n)
+            for (u, d, sc, cr), n in merged.items()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0027_movejob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperatorDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status_call', models.CharField(blank=True, default='', max_length=20)),
+                ('call_result', models.CharField(blank=True, default='', max_length=32)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Operator daily stat',
+                'verbose_name_plural': 'Operator daily stats',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'status_call', 'call_result'), name='operator_daily_stat_key')],
+            },
+        ),
+        migrations.RunPython(fill_operator_stats, migrations.RunPython.noop),
+    ]
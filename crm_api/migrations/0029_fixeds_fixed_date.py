@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:40
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+BACKFILL_CHUNK = 20000
+
+
+def backfill_fixed_date(apps, schema_editor):
+    Fixeds = apps.get_model("crm_api", "Fixeds")
+    last_pk = 0
+    while True:
+        pks = list(
+            Fixeds.objects.filter(pk__gt=last_pk, fixed_at__isnull=False)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BACKFILL_CHUNK]
+        )
+        if not pks:
+            break
+        Fixeds.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]).update(fixed_date=TruncDate("fixed_at"))
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0028_operatordailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fixeds',
+            name='fixed_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_fixed_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['fixed_date'], name='crm_api_fix_fixed_d_746420_idx'),
+        ),
+        # новый индекс под FK создаётся до удаления старого — InnoDB не даёт оставить FK без индекса
+        migrations.AddIndex(
+            model_name='fixeds',
+            index=models.Index(fields=['fixed_by', 'fixed_date'], name='crm_api_fix_fixed_b_984753_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_fixed_b_45e46a_idx',
+        ),
+    ]
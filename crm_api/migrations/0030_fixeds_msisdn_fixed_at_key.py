@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:20
+
+import datetime
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+UNDATED = datetime.date(1970, 1, 1)
+DELETE_CHUNK = 5000
+
+
+def delete_duplicates(apps, schema_editor):
+    """Оставляет по (msisdn, fixed_at) запись с наименьшим id, свёртку уменьшает на удалённые."""
+    Fixeds = apps.get_model("crm_api", "Fixeds")
+    OperatorDailyStat = apps.get_model("crm_api", "OperatorDailyStat")
+
+    groups = (
+        Fixeds.objects.filter(msisdn__isnull=False, fixed_at__isnull=False)
+        .values("msisdn", "fixed_at")
+        .annotate(n=Count("id"), keep=Min("id"))
+        .filter(n__gt=1)
+        .order_by()
+    )
+    doomed = []
+    for g in groups.iterator(chunk_size=5000):
+        doomed += (
+            Fixeds.objects.filter(msisdn=g["msisdn"], fixed_at=g["fixed_at"])
+            .exclude(pk=g["keep"])
+            .values_list("pk", flat=True)
+        )
+
+    deltas = Counter()
+    for start in range(0, len(doomed), DELETE_CHUNK):
+        qs = Fixeds.objects.filter(pk__in=doomed[start:start + DELETE_CHUNK])
+        for fixed_by_id, fixed_date, status_call, call_result in qs.values_list(
+            "fixed_by_id", "fixed_date", "status_call", "call_result",
+        ):
+            if fixed_by_id is not None:
+                deltas[(fixed_by_id, fixed_date or UNDATED, status_call or "", call_result or "")] += 1
+        qs.delete()
+
+    for (user_id, day, status_call, call_result), n in deltas.items():
+        OperatorDailyStat.objects.filter(
+            user_id=user_id, day=day, status_call=status_call, call_result=call_result,
+        ).update(count=F("count") - n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0029_fixeds_fixed_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        # уникальный индекс (msisdn, fixed_at) заменяет обычный с теми же колонками
+        migrations.AddConstraint(
+            model_name='fixeds',
+            constraint=models.UniqueConstraint(fields=('msisdn', 'fixed_at'), name='fixeds_msisdn_fixed_at_key'),
+        ),
+        migrations.RemoveIndex(
+            model_name='fixeds',
+            name='crm_api_fix_msisdn_d569c6_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0030_fixeds_msisdn_fixed_at_key'),
+    ]
+
+    operations = [
+        # только состояние модели: auto_now работает в Python, схема колонки не меняется
+        migrations.AlterField(
+            model_name='fixeds',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_api', '0031_fixeds_updated_at_auto_now'),
+    ]
+
+    operations = [
+        # только состояние модели: значение по-прежнему ставит Python, схема колонки не меняется
+        migrations.AlterField(
+            model_name='fixeds',
+            name='moved_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False, null=True),
+        ),
+    ]
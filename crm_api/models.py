@@ -1,7 +1,10 @@
-from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from crm_api.services.phones import normalize_phone
 
 class User(AbstractUser):
     ROLE_OPERATOR = "operator"
@@ -54,13 +57,40 @@ ABONENT_ANSWER_CHOICES = [
 ]
 TECH_CHOICES = [("pon", "pon"), ("vdsl", "vdsl"), ("adsl", "adsl"), ("ethernet", "ethernet")]
 
-from django.conf import settings
-from django.db import models, transaction
-from django.db.models import Q
+STATUS_CATEGORY_SUSPEND = "suspend"
+STATUS_CATEGORY_ACTIVE = "active"
+STATUS_CATEGORY_OTHER = "other"
+STATUS_CATEGORY_CHOICES = [
+    (STATUS_CATEGORY_SUSPEND, "Suspend"),
+    (STATUS_CATEGORY_ACTIVE, "Active"),
+    (STATUS_CATEGORY_OTHER, "Other"),
+]
+
+
+def classify_status(value) -> str:
+    """Категория статуса по тем же правилам, что и _normalize_status в импортёре."""
+    if value is None:
+        return STATUS_CATEGORY_OTHER
+    s = str(value).strip().lower()
+    if "susp" in s or "приостан" in s:
+        return STATUS_CATEGORY_SUSPEND
+    if "activ" in s or "актив" in s or "включ" in s:
+        return STATUS_CATEGORY_ACTIVE
+    return STATUS_CATEGORY_OTHER
+
+
+def _with_derived_fields(update_fields, derived: dict) -> set:
+    """Добавляет в update_fields вычисляемые колонки, если изменились их источники."""
+    fields = set(update_fields)
+    for source, target in derived.items():
+        if source in fields:
+            fields.add(target)
+    return fields
+
+
+ACTIVES_DERIVED_FIELDS = {"status": "status_category", "msisdn": "msisdn_norm", "phone": "phone_norm"}
+FIXEDS_DERIVED_FIELDS = {"msisdn": "msisdn_norm", "phone": "phone_norm", "fixed_at": "fixed_date"}
 
-from django.conf import settings
-from django.db import models, transaction
-from django.db.models import Q
 
 class Actives(models.Model):
     msisdn = models.CharField(max_length=250, null=True, blank=True)
@@ -75,9 +105,15 @@ class Actives(models.Model):
     account = models.CharField(max_length=32, null=True, blank=True)
     branches = models.CharField(max_length=300, null=True, blank=True)
     status = models.CharField(max_length=150, null=True, blank=True)
+    status_category = models.CharField(
+        max_length=16, choices=STATUS_CATEGORY_CHOICES, default=STATUS_CATEGORY_OTHER, editable=False,
+    )
     phone = models.CharField(max_length=15, null=True, blank=True)
     address = models.TextField(null=True,blank=True)
 
+    msisdn_norm = models.CharField(max_length=16, null=True, blank=True, editable=False)
+    phone_norm = models.CharField(max_length=16, null=True, blank=True, editable=False)
+
     status_call = models.CharField(max_length=20, choices=STATUS_CALL_CHOICES, null=True, blank=True)
     call_result = models.CharField(max_length=32, choices=CALL_RESULT_CHOICES, null=True, blank=True)
     abonent_answer = models.CharField(max_length=255, choices=ABONENT_ANSWER_CHOICES, null=True, blank=True)
@@ -96,26 +132,54 @@ class Actives(models.Model):
     )
     fixed_at = models.DateTimeField(null=True, blank=True, verbose_name="Когда звонил")
 
+    # очередь обзвона: кто взял запись и до какого момента она за ним
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="claims",
+        editable=False,
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name = "Active"
         verbose_name_plural = "Actives"
+        # подобраны под реальные запросы (см. manage.py index_audit)
         indexes = [
             models.Index(fields=["msisdn"]),
             models.Index(fields=["phone"]),
-            models.Index(fields=["branches"]),
-            models.Index(fields=["rate_plan"]),
-            models.Index(fields=["status"]),
-            models.Index(fields=["status_call"]),
-            models.Index(fields=["call_result"]),
-            models.Index(fields=["abonent_answer"]),
-            models.Index(fields=["tech"]),
+            models.Index(fields=["msisdn_norm"]),
+            models.Index(fields=["phone_norm"]),
+            models.Index(fields=["account"]),
+            models.Index(fields=["created_at"]),
             models.Index(fields=["fixed_at"]),
-            models.Index(fields=["fixed_by"]),
+            models.Index(fields=["fixed_by"]),  # InnoDB: индекс нужен FK-ограничению
+            models.Index(fields=["status_category", "created_at"]),
+            models.Index(fields=["status_category", "status_call"]),
         ]
 
     def __str__(self):
         return f"{self.msisdn or '-'} — {self.client or '-'}"
 
+    def save(self, *args, **kwargs):
+        self.status_category = classify_status(self.status)
+        self.msisdn_norm = normalize_phone(self.msisdn)
+        self.phone_norm = normalize_phone(self.phone)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = _with_derived_fields(update_fields, ACTIVES_DERIVED_FIELDS)
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # здесь, а не post_delete: приёмник отключил бы быстрый DELETE ... WHERE id IN (...) при переносе
+        from crm_api.services.msisdn import phone_index
+
+        result = super().delete(*args, **kwargs)
+        phones = [self.phone_norm]
+        transaction.on_commit(lambda: phone_index.discard(phones))
+        return result
+
     @property
     def who_called(self) -> str:
         if not self.fixed_by:
@@ -125,7 +189,7 @@ class Actives(models.Model):
 
 class SuspendsManager(models.Manager):
     def get_queryset(self):
-        return super().get_queryset().filter(Q(status__icontains="suspend"))
+        return super().get_queryset().filter(status_category=STATUS_CATEGORY_SUSPEND)
 
 class Suspends(Actives):
     objects = SuspendsManager()
@@ -151,6 +215,9 @@ class Fixeds(models.Model):
     phone = models.CharField(max_length=15, null=True, blank=True)
     address = models.TextField(null=True,blank=True)
 
+    msisdn_norm = models.CharField(max_length=16, null=True, blank=True, editable=False)
+    phone_norm = models.CharField(max_length=16, null=True, blank=True, editable=False)
+
     status_call = models.CharField(max_length=20, choices=STATUS_CALL_CHOICES, null=True, blank=True)
     call_result = models.CharField(max_length=32, choices=CALL_RESULT_CHOICES, null=True, blank=True)
     abonent_answer = models.CharField(max_length=255, choices=ABONENT_ANSWER_CHOICES, null=True, blank=True)
@@ -165,34 +232,60 @@ class Fixeds(models.Model):
         verbose_name="Кто звонил",
     )
     fixed_at = models.DateTimeField(null=True, blank=True, verbose_name="Когда звонил")
+    # локальная дата fixed_at (USE_TZ=False, Asia/Tashkent) — группировка по дням без DATE() на каждую строку
+    fixed_date = models.DateField(null=True, blank=True, editable=False)
 
     created_at = models.DateTimeField(null=True, blank=True)
-    updated_at = models.DateTimeField(null=True, blank=True)
-    moved_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)  # по нему ETag списков и записей
+    # не auto_now_add: у всей пачки переноса один moved_at, по нему свёртка находит вставленные строки
+    moved_at = models.DateTimeField(default=timezone.now, editable=False, null=True, blank=True)
 
     class Meta:
         verbose_name = "Fixed"
         verbose_name_plural = "Fixeds"
         indexes = [
-            models.Index(fields=["msisdn"]),
-            models.Index(fields=["phone"]),
-            models.Index(fields=["branches"]),
-            models.Index(fields=["rate_plan"]),
-            models.Index(fields=["status"]),
-            models.Index(fields=["status_call"]),
-            models.Index(fields=["call_result"]),
-            models.Index(fields=["abonent_answer"]),
-            models.Index(fields=["tech"]),
+            models.Index(fields=["msisdn_norm"]),
+            models.Index(fields=["phone_norm"]),
             models.Index(fields=["fixed_at"]),
-            models.Index(fields=["fixed_by"]),
             models.Index(fields=["created_at"]),
             models.Index(fields=["updated_at"]),
             models.Index(fields=["moved_at"]),
+            models.Index(fields=["fixed_date"]),
+            models.Index(fields=["fixed_by", "fixed_date"]),  # покрывает и FK fixed_by
+        ]
+        constraints = [
+            # одна фиксация номера на момент времени; NULL в любом из полей не конфликтует
+            models.UniqueConstraint(fields=["msisdn", "fixed_at"], name="fixeds_msisdn_fixed_at_key"),
         ]
 
     def __str__(self):
         return f"{self.msisdn or '-'} — {self.client or '-'} (fixed)"
 
+    def save(self, *args, **kwargs):
+        from crm_api.services import operator_stats
+
+        self.msisdn_norm = normalize_phone(self.msisdn)
+        self.phone_norm = normalize_phone(self.phone)
+        self.fixed_date = self.fixed_at.date() if self.fixed_at else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = _with_derived_fields(update_fields, FIXEDS_DERIVED_FIELDS)
+
+        old_key = None
+        if not self._state.adding and (update_fields is None or operator_stats.ROLLUP_FIELDS & set(update_fields)):
+            old_key = operator_stats.stored_key(self.pk)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            operator_stats.record_change(old_key, operator_stats.key_of(self))
+
+    def delete(self, *args, **kwargs):
+        from crm_api.services import operator_stats
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            operator_stats.record([operator_stats.key_of(self)], sign=-1)
+        return result
+
     @property
     def who_called(self) -> str:
         if not self.fixed_by:
@@ -200,60 +293,200 @@ class Fixeds(models.Model):
         return (getattr(self.fixed_by, "fio", None) or self.fixed_by.get_full_name() or self.fixed_by.username)
 
 
+# что переносится из Actives/Suspends в Fixeds; fixed_by_id — чтобы не подгружать пользователя.
+# updated_at и moved_at не копируются: оба — момент вставки в Fixeds
+FIXEDS_COPY_FIELDS = [
+    "msisdn", "departments", "status_from", "days_in_status", "write_offs_date",
+    "client", "rate_plan", "balance", "subscription_fee", "account", "branches",
+    "status", "phone", "address", "status_call", "call_result", "abonent_answer", "note",
+    "tech", "fixed_by_id", "fixed_at", "created_at",
+    "msisdn_norm", "phone_norm",
+]
+
+
+def fixeds_from(obj: Actives) -> Fixeds:
+    """Несохранённая копия записи Actives/Suspends для Fixeds."""
+    fixed = Fixeds(**{f: getattr(obj, f) for f in FIXEDS_COPY_FIELDS})
+    fixed.fixed_date = obj.fixed_at.date() if obj.fixed_at else None
+    if Actives.fixed_by.is_cached(obj):
+        fixed.fixed_by = obj.fixed_by
+    return fixed
+
+
+def copy_to_fixeds(
+    objs: list,
+    *,
+    delete: bool = True,
+    ignore_conflicts: bool = False,
+    batch_size: int = 2000,
+) -> list[Fixeds]:
+    """
+    Общий путь переноса Actives/Suspends -> Fixeds: INSERT копий и один DELETE ... WHERE id IN (...).
+    ignore_conflicts — дубли по (msisdn, fixed_at) отсекает уникальный ключ (INSERT IGNORE), исходные
+    строки всё равно удаляются; свёртка тогда считается в БД по moved_at пачки — только по вставленным.
+    Возвращает копии (при ignore_conflicts — включая пропущенные). Вызывать внутри transaction.atomic().
+    """
+    from crm_api.services import operator_stats
+    from crm_api.services.msisdn import phone_index
+
+    moved_at = timezone.now()
+    fixed = [fixeds_from(obj) for obj in objs]
+    for f in fixed:
+        f.moved_at = moved_at
+    if ignore_conflicts:
+        Fixeds.objects.bulk_create(fixed, batch_size=batch_size, ignore_conflicts=True)
+        with connection.cursor() as cursor:
+            operator_stats.record_from_table(
+                cursor, Fixeds._meta.db_table, f"{connection.ops.quote_name('moved_at')} = %s", [moved_at],
+            )
+    elif len(fixed) == 1:
+        fixed[0].save(force_insert=True)  # одиночная вставка — чтобы в ответе был id; свёртку обновит save()
+    else:
+        Fixeds.objects.bulk_create(fixed, batch_size=batch_size)
+        operator_stats.record(operator_stats.key_of(f) for f in fixed)
+    if delete:
+        Actives.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+        phones = [obj.phone_norm for obj in objs]
+        transaction.on_commit(lambda: phone_index.discard(phones))
+    return fixed
+
+
+MOVE_ENGINE_PYTHON = "python"
+MOVE_ENGINE_SQL = "sql"
+
+
+def _move_range_sql(first_pk, last_pk, *, delete: bool, ignore_conflicts: bool) -> int:
+    """
+    Set-based перенос диапазона pk целиком в БД:
+    INSERT INTO fixeds (...) SELECT ... FROM actives WHERE <suspend и status_call задан> AND id BETWEEN a AND b
+    и такой же DELETE. Строки диапазона к этому моменту уже заблокированы вызывающим.
+    """
+    from crm_api.services import operator_stats
+
+    qn = connection.ops.quote_name
+    src = Actives._meta
+    dst = Fixeds._meta
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+
+    dst_fields = [dst.get_field(f) for f in FIXEDS_COPY_FIELDS]
+    dst_fields += [dst.get_field("fixed_date"), dst.get_field("moved_at"), dst.get_field("updated_at")]
+    dst_cols = ", ".join(qn(f.column) for f in dst_fields)
+    src_cols = ", ".join(qn(src.get_field(f).column) for f in FIXEDS_COPY_FIELDS)
+    src_cols += f", DATE({qn(src.get_field('fixed_at').column)})"
+    where = (
+        f"{qn(src.get_field('status_category').column)} = %s"
+        f" AND {qn('status_call')} IS NOT NULL AND {qn('status_call')} <> ''"
+        f" AND {qn(src.pk.column)} BETWEEN %s AND %s"
+    )
+    params = [STATUS_CATEGORY_SUSPEND, first_pk, last_pk]
+    suffix = connection.ops.on_conflict_suffix_sql(dst_fields, on_conflict, None, None)
+    moved_at = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{connection.ops.insert_statement(on_conflict=on_conflict)} {qn(dst.db_table)} ({dst_cols}) "
+            f"SELECT {src_cols}, %s, %s FROM {qn(src.db_table)} WHERE {where} {suffix}",
+            [moved_at, moved_at, *params],
+        )
+        inserted = cursor.rowcount
+        # свёртка по реально вставленным строкам (дубли, пропущенные INSERT IGNORE, не считаются)
+        operator_stats.record_from_table(
+            cursor, dst.db_table, f"{qn(dst.get_field('moved_at').column)} = %s", [moved_at],
+        )
+        if delete:
+            cursor.execute(f"DELETE FROM {qn(src.db_table)} WHERE {where}", params)
+    return inserted
+
+
+MOVE_ORDERINGS = ("pk", "id")
+
+
 def move_suspends_with_status_call_to_fixeds(
     chunk_size: int = 2000,
     order_by: str = "pk",
     delete_after_copy: bool = True,
     ignore_duplicates: bool = False,
     dry_run: bool = False,
+    start_after_pk: int = 0,
+    on_chunk=None,
+    engine: str = MOVE_ENGINE_PYTHON,
 ) -> int:
-    qs = Suspends.objects.exclude(status_call__isnull=True).exclude(status_call="").order_by(order_by)
+    """
+    Перенос Suspends с заполненным status_call в Fixeds чанками по возрастанию pk.
+    Каждый чанк коммитится отдельно; on_chunk(last_pk, moved) вызывается внутри
+    транзакции чанка, так что сохранённый водяной знак всегда совпадает с тем, что уже перенесено.
 
-    fields_to_copy = [
-        "msisdn", "departments", "status_from", "days_in_status", "write_offs_date",
-        "client", "rate_plan", "balance", "subscription_fee", "account", "branches",
-        "status", "phone", "status_call", "call_result", "abonent_answer", "note",
-        "tech", "fixed_by", "fixed_at",'created_at',"updated_at"
-    ]
+    engine="python" — bulk_create копий объектов; engine="sql" — INSERT ... SELECT / DELETE
+    по диапазону pk без выгрузки строк в Python. Счётчики у обоих одинаковые.
+
+    order_by оставлен для совместимости: водяной знак — pk, поэтому допустим только порядок по pk.
+    """
+    if order_by not in MOVE_ORDERINGS:
+        raise ValueError(f"order_by={order_by!r} не поддерживается: перенос идёт по возрастанию pk")
+    from crm_api.services.msisdn import phone_index
+
+    qs = Suspends.objects.exclude(status_call__isnull=True).exclude(status_call="").order_by("pk")
 
     moved = 0
-    to_create = []
-    ids_to_delete = []
-    for obj in qs.only(*fields_to_copy).iterator(chunk_size=chunk_size):
-        data = {f: getattr(obj, f) for f in fields_to_copy}
-        to_create.append(Fixeds(**data))
-        ids_to_delete.append(obj.pk)
-
-        if len(to_create) >= chunk_size:
+    last_pk = start_after_pk
+    while True:
+        with transaction.atomic():
+            chunk_qs = qs.filter(pk__gt=last_pk)
             if not dry_run:
-                with transaction.atomic():
-                    Fixeds.objects.bulk_create(
-                        to_create,
-                        batch_size=chunk_size,
-                        ignore_conflicts=ignore_duplicates,
-                    )
+                chunk_qs = chunk_qs.select_for_update()
+
+            if engine == MOVE_ENGINE_SQL:
+                rows = list(chunk_qs.values_list("pk", "phone_norm")[:chunk_size])
+                if not rows:
+                    break
+                if not dry_run:
+                    _move_range_sql(rows[0][0], rows[-1][0], delete=delete_after_copy,
+                                    ignore_conflicts=ignore_duplicates)
                     if delete_after_copy:
-                        Actives.objects.filter(pk__in=ids_to_delete).delete()
-            moved += len(to_create)
-
-            to_create.clear()
-            ids_to_delete.clear()
-
-    if to_create:
-        if not dry_run:
-            with transaction.atomic():
-                Fixeds.objects.bulk_create(
-                    to_create,
-                    batch_size=chunk_size,
-                    ignore_conflicts=ignore_duplicates,
-                )
-                if delete_after_copy:
-                    Actives.objects.filter(pk__in=ids_to_delete).delete()
-        moved += len(to_create)
+                        phones = [phone for _, phone in rows]
+                        transaction.on_commit(lambda phones=phones: phone_index.discard(phones))
+                last_pk, count = rows[-1][0], len(rows)
+            else:
+                batch = list(chunk_qs[:chunk_size])
+                if not batch:
+                    break
+                if not dry_run:
+                    copy_to_fixeds(batch, delete=delete_after_copy,
+                                   ignore_conflicts=ignore_duplicates, batch_size=chunk_size)
+                last_pk, count = batch[-1].pk, len(batch)
+
+            moved += count
+            if on_chunk:
+                on_chunk(last_pk, moved)
 
     return moved
 
 
+class OperatorDailyStat(models.Model):
+    """
+    Свёртка Fixeds: сколько записей оператор зафиксировал за день по status_call/call_result.
+    Ведётся инкрементально (crm_api.services.operator_stats); пустые status_call/call_result — "".
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    status_call = models.CharField(max_length=20, blank=True, default="")
+    call_result = models.CharField(max_length=32, blank=True, default="")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Operator daily stat"
+        verbose_name_plural = "Operator daily stats"
+        constraints = [
+            # уникальный ключ upsert'а; его префикс (user, day) покрывает и FK, и выборки по периоду
+            models.UniqueConstraint(
+                fields=["user", "day", "status_call", "call_result"], name="operator_daily_stat_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day} {self.status_call or '-'}/{self.call_result or '-'}: {self.count}"
+
+
 class ExcelUpload(models.Model):
     file = models.FileField(upload_to="uploads/%Y/%m/%d")
     original_name = models.CharField(max_length=255)
@@ -282,4 +515,23 @@ class UploadJob(models.Model):
     target_table = models.CharField(max_length=128, default="actives")
 
     def __str__(self):
-        return f"UploadJob#{self.id} {self.status}"
\ No newline at end of file
+        return f"UploadJob#{self.id} {self.status}"
+
+
+class MoveJob(models.Model):
+    """Фоновый перенос Suspends -> Fixeds с водяным знаком по pk для возобновления."""
+    STATUS_CHOICES = UploadJob.STATUS_CHOICES
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending")
+    last_pk = models.BigIntegerField(default=0)
+    total_rows = models.IntegerField(default=0)
+    moved_rows = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"MoveJob#{self.id} {self.status}"
\ No newline at end of file
@@ -0,0 +1,32 @@
+# crm_api/renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson — опциональная зависимость
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON через orjson, если он установлен; иначе — обычный JSONRenderer.
+    datetime/Decimal/lazy-строки отдаются энкодеру DRF, чтобы формат совпадал байт в байт
+    по значениям. indent (?indent= / Accept) — тоже через стандартный путь.
+    Оба пути — компактные разделители и кириллица без \\uXXXX, независимо от UNICODE_JSON/COMPACT_JSON.
+    """
+    ensure_ascii = False
+    compact = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
@@ -1,5 +1,11 @@
+import operator
+from decimal import Decimal
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import *
+from .services.work_queue import CLAIM_ORDERINGS
+from django.db import IntegrityError, models
 from django.utils import timezone
 
 
@@ -9,6 +15,34 @@ class ActivesFixationWriteSerializer(serializers.ModelSerializer):
         fields = ["status_call", "call_result", "abonent_answer", "note", "tech"]
 
 
+class FixationBulkItemSerializer(ActivesFixationWriteSerializer):
+    id = serializers.IntegerField()
+
+    class Meta(ActivesFixationWriteSerializer.Meta):
+        fields = ["id", *ActivesFixationWriteSerializer.Meta.fields]
+
+
+class FixationBulkSerializer(serializers.Serializer):
+    MAX_ITEMS = 5000
+
+    items = FixationBulkItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        if len(items) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f"Не больше {self.MAX_ITEMS} записей за раз.")
+        ids = [item["id"] for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("id в списке повторяются.")
+        return items
+
+
+class ClaimNextSerializer(serializers.Serializer):
+    """Параметры очереди обзвона (query string): ?count=&order=branch|days&branch=."""
+    count = serializers.IntegerField(min_value=1, default=1)
+    order = serializers.ChoiceField(choices=list(CLAIM_ORDERINGS), required=False, allow_blank=True)
+    branch = serializers.CharField(required=False, allow_blank=True)
+
+
 class ActivesSerializer(serializers.ModelSerializer):
     called_by_id = serializers.IntegerField(source="fixed_by_id", read_only=True)
     called_by = serializers.CharField(source="who_called", read_only=True)
@@ -88,6 +122,18 @@ class UploadJobSerializer(serializers.ModelSerializer):
         ]
 
 
+class MoveJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MoveJob
+        fields = [
+            "id", "status", "last_pk", "total_rows", "moved_rows",
+            "last_error", "created_at", "updated_at", "finished_at",
+        ]
+
+
+DUPLICATE_FIXED_MESSAGE = "Запись с таким msisdn и fixed_at уже существует."
+
+
 class FixedsSerializer(serializers.ModelSerializer):
     fixed_by_label = serializers.SerializerMethodField(read_only=True)
 
@@ -103,6 +149,8 @@ class FixedsSerializer(serializers.ModelSerializer):
             "created_at","updated_at","moved_at",
         ]
         read_only_fields = ["id", "moved_at", "fixed_by_label"]
+        # уникальность (msisdn, fixed_at) держит constraint в БД: без UniqueTogetherValidator и его SELECT
+        validators = []
 
     def get_fixed_by_label(self, obj):
         u = obj.fixed_by
@@ -110,22 +158,125 @@ class FixedsSerializer(serializers.ModelSerializer):
             return ""
         return getattr(u, "fio", None) or u.get_full_name() or u.username
 
-    def validate(self, attrs):
-        msisdn = attrs.get("msisdn", getattr(self.instance, "msisdn", None))
-        fixed_at = attrs.get("fixed_at", getattr(self.instance, "fixed_at", None))
-        if msisdn and fixed_at:
-            qs = Fixeds.objects.filter(msisdn=msisdn, fixed_at=fixed_at)
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise serializers.ValidationError("Запись с таким msisdn и fixed_at уже существует.")
-        return attrs
+    def _duplicate_error(self):
+        return serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_FIXED_MESSAGE]})
 
     def create(self, validated_data):
         validated_data.setdefault("created_at", timezone.now())
-        validated_data.setdefault("updated_at", validated_data["created_at"])
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            raise self._duplicate_error()
 
     def update(self, instance, validated_data):
-        validated_data["updated_at"] = timezone.now()
-        return super().update(instance, validated_data)
\ No newline at end of file
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
+            raise self._duplicate_error()
+
+
+OPERATOR_LABEL_COLUMNS = ("fixed_by", "fixed_by__fio", "fixed_by__first_name", "fixed_by__last_name", "fixed_by__username")
+
+
+def operator_label(row) -> str:
+    """Как who_called / get_fixed_by_label, но по строке values()."""
+    if row["fixed_by"] is None:
+        return ""
+    full = f'{row["fixed_by__first_name"] or ""} {row["fixed_by__last_name"] or ""}'.strip()
+    return row["fixed_by__fio"] or full or row["fixed_by__username"]
+
+
+def _datetime_converter(field):
+    def convert(value):
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return convert
+
+
+def _decimal_converter(field):
+    exp = Decimal(1).scaleb(-field.decimal_places)
+    return lambda value: f"{value.quantize(exp):f}"
+
+
+_CONVERTERS = {
+    models.DateTimeField: _datetime_converter,
+    models.DateField: lambda field: lambda value: value.isoformat(),
+    models.DecimalField: _decimal_converter,
+}
+
+
+def _converted(column, convert):
+    def get(row):
+        value = row[column]
+        return None if value is None else convert(value)
+    return get
+
+
+class RowMapper:
+    """
+    Быстрый путь чтения для list: queryset.values() -> dict в том же формате, что отдаёт
+    сериализатор, без DRF-полей на каждую ячейку. Геттеры по полям собираются один раз;
+    computed — {ключ: (колонки values(), функция(row))}. formatted=False — значения как есть.
+    """
+    MAX_PROJECTIONS = 64
+
+    def __init__(self, model, fields, *, sources=None, computed=None, formatted=True):
+        self.model = model
+        self.fields = tuple(fields)
+        self._options = {"sources": sources, "computed": computed, "formatted": formatted}
+        self._projections = {}
+        sources = sources or {}
+        computed = computed or {}
+        self.steps, columns = [], []
+        for name in self.fields:
+            if name in computed:
+                deps, get = computed[name]
+            else:
+                column = sources.get(name, name)
+                field = model._meta.get_field(column)
+                factory = _CONVERTERS.get(type(field)) if formatted else None
+                deps = (column,)
+                get = _converted(column, factory(field)) if factory else operator.itemgetter(column)
+            self.steps.append((name, get))
+            columns += [c for c in deps if c not in columns]
+        self.columns = tuple(columns)
+
+    def project(self, names) -> "RowMapper":
+        """Маппер только по части полей (?select=): сужается и SELECT, и JSON. Порядок — как в fields."""
+        wanted = set(names)
+        key = tuple(f for f in self.fields if f in wanted)
+        if key == self.fields:
+            return self
+        mapper = self._projections.get(key)
+        if mapper is None:
+            if len(self._projections) >= self.MAX_PROJECTIONS:
+                self._projections.clear()
+            mapper = self._projections[key] = RowMapper(self.model, key, **self._options)
+        return mapper
+
+    def values(self, qs, *extra):
+        return qs.values(*self.columns, *(c for c in extra if c not in self.columns))
+
+    def map(self, rows) -> list[dict]:
+        steps = self.steps
+        return [{name: get(row) for name, get in steps} for row in rows]
+
+
+ACTIVES_ROWS = RowMapper(
+    Actives, ActivesSerializer.Meta.fields,
+    sources={"called_by_id": "fixed_by", "called_at": "fixed_at"},
+    computed={"called_by": (OPERATOR_LABEL_COLUMNS, operator_label)},
+)
+
+FIXEDS_ROWS = RowMapper(
+    Fixeds, FixedsSerializer.Meta.fields,
+    computed={"fixed_by_label": (OPERATOR_LABEL_COLUMNS, operator_label)},
+)
+
+# search-all: сырые значения, как отдавал norm() по объектам (Decimal/datetime — энкодером DRF)
+SEARCH_ROWS = RowMapper(
+    Actives, ActivesSerializer.Meta.fields,
+    sources={"called_by_id": "fixed_by", "called_at": "fixed_at"},
+    computed={"called_by": (OPERATOR_LABEL_COLUMNS, operator_label)},
+    formatted=False,
+)
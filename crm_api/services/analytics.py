@@ -0,0 +1,141 @@
+# crm_api/services/analytics.py
+import os
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from crm_api.models import STATUS_CATEGORY_ACTIVE, Actives, Fixeds
+
+SNAPSHOT_NAME = "fixeds_snapshot.pkl"
+READ_CHUNK = 20000
+REPORT_TTL = 24 * 60 * 60
+
+FIXEDS_COLUMNS = [
+    "id", "msisdn_norm", "fixed_date", "fixed_by_id", "branches", "rate_plan", "tech",
+    "status_call", "call_result", "abonent_answer",
+]
+CATEGORY_COLUMNS = ["branches", "rate_plan", "tech", "status_call", "call_result", "abonent_answer"]
+COHORT_DIMENSIONS = ["week", "branches", "rate_plan", "tech"]
+NOT_SET = "не указано"
+
+# исход после фиксации по текущему состоянию Actives (последний импорт)
+OUTCOME_REACTIVATED = "reactivated"
+OUTCOME_STILL_SUSPENDED = "still_suspended"
+OUTCOME_GONE = "gone"
+
+
+def snapshot_path():
+    return settings.ANALYTICS_DIR / SNAPSHOT_NAME
+
+
+def _read_frame(qs, columns) -> pd.DataFrame:
+    """values_list чанками -> DataFrame; строки не превращаются в модели."""
+    frames, chunk = [], []
+    for row in qs.values_list(*columns).iterator(chunk_size=READ_CHUNK):
+        chunk.append(row)
+        if len(chunk) >= READ_CHUNK:
+            frames.append(pd.DataFrame(chunk, columns=columns))
+            chunk = []
+    if chunk or not frames:
+        frames.append(pd.DataFrame(chunk, columns=columns))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_snapshot() -> pd.DataFrame:
+    """
+    Колоночный снимок Fixeds + исход по Actives. Строится вне рабочего времени
+    (manage.py build_analytics_snapshot); отчёты читают только его.
+    """
+    fixeds = _read_frame(Fixeds.objects.exclude(fixed_date__isnull=True).order_by(), FIXEDS_COLUMNS)
+    actives = _read_frame(
+        Actives.objects.exclude(msisdn_norm__isnull=True).order_by(), ["msisdn_norm", "status_category"],
+    )
+    # номер мог прийти в импорте несколько раз: активен, если активна хоть одна запись
+    is_active = (
+        actives.assign(active=actives["status_category"].eq(STATUS_CATEGORY_ACTIVE))
+        .groupby("msisdn_norm")["active"].any()
+    )
+
+    state = fixeds["msisdn_norm"].map(is_active)
+    fixeds["outcome"] = pd.Categorical(
+        np.select(
+            [state.eq(True), state.eq(False)],
+            [OUTCOME_REACTIVATED, OUTCOME_STILL_SUSPENDED],
+            default=OUTCOME_GONE,
+        ),
+        categories=[OUTCOME_REACTIVATED, OUTCOME_STILL_SUSPENDED, OUTCOME_GONE],
+    )
+    fixeds["fixed_date"] = pd.to_datetime(fixeds["fixed_date"])
+    for col in CATEGORY_COLUMNS:
+        fixeds[col] = fixeds[col].fillna(NOT_SET).replace("", NOT_SET).astype("category")
+    fixeds.attrs["built_at"] = timezone.now().isoformat()
+
+    path = snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    fixeds.to_pickle(tmp)
+    os.replace(tmp, path)  # читатели не увидят недописанный файл
+    return fixeds
+
+
+def load_snapshot() -> pd.DataFrame | None:
+    path = snapshot_path()
+    if not path.exists():
+        return None
+    return pd.read_pickle(path)
+
+
+def _rates(grouped) -> list[dict]:
+    """fixed / reactivated / rate по группам; grouped — groupby по снимку."""
+    table = (
+        grouped["reactivated"].agg(fixed="size", reactivated="sum")
+        .query("fixed > 0")
+        .assign(rate=lambda t: (t["reactivated"] / t["fixed"]).round(4))
+        .reset_index()
+    )
+    for col in table.columns:
+        if isinstance(table[col].dtype, pd.CategoricalDtype):
+            table[col] = table[col].astype(str)
+    table["reactivated"] = table["reactivated"].astype(int)
+    return table.to_dict("records")
+
+
+def compute_report(df: pd.DataFrame) -> dict:
+    df = df.assign(
+        reactivated=df["outcome"].eq(OUTCOME_REACTIVATED),
+        week=(df["fixed_date"] - pd.to_timedelta(df["fixed_date"].dt.weekday, unit="D")).dt.strftime("%Y-%m-%d"),
+    )
+    reached = df["status_call"].eq("Дозвонился")
+    has_result = df["call_result"].ne(NOT_SET)
+    has_answer = df["abonent_answer"].ne(NOT_SET)
+
+    return {
+        "built_at": df.attrs.get("built_at"),
+        "total": int(len(df)),
+        "stages": {
+            "fixed": int(len(df)),
+            "reached": int(reached.sum()),
+            "with_call_result": int((reached & has_result).sum()),
+            "with_abonent_answer": int((reached & has_result & has_answer).sum()),
+            "reactivated": int(df["reactivated"].sum()),
+        },
+        "outcomes": {k: int(v) for k, v in df["outcome"].value_counts().items()},
+        "funnel": _rates(df.groupby(["call_result", "abonent_answer"], observed=True)),
+        "cohorts": {dim: _rates(df.groupby(dim, observed=True)) for dim in COHORT_DIMENSIONS},
+    }
+
+
+def funnel_report() -> dict | None:
+    """Отчёт по последнему снимку; считается раз в день, в БД не ходит."""
+    path = snapshot_path()
+    if not path.exists():
+        return None
+    key = f"crm:analytics:funnel:{timezone.now().date()}:{int(path.stat().st_mtime)}"
+    report = cache.get(key)
+    if report is None:
+        report = compute_report(load_snapshot())
+        cache.set(key, report, REPORT_TTL)
+    return report
@@ -6,7 +6,9 @@ from django.db import IntegrityError, transaction
 from django.db.models import Q
 from datetime import date, datetime as dt
 from urllib.parse import quote_plus
-from crm_api.models import UploadJob, Actives
+from crm_api.models import UploadJob, Actives, classify_status
+from crm_api.services.msisdn import phone_index
+from crm_api.services.phones import normalize_phone_series
 
 BATCH = 1000
 USE_DJANGO_ORM_UPSERT = True  # CHANGED: безопасный upsert без дублей в БД
@@ -31,9 +33,13 @@ COLUMNS = [
     "status_call",      # NEW
     "call_result",      # NEW
     "abonent_answer",   # NEW
+    "status_category",  # вычисляется из status, в Excel не приходит
+    "msisdn_norm",      # вычисляется из msisdn
+    "phone_norm",       # вычисляется из phone
 ]
 
 UNIQ_FIELDS = {"msisdn", "account", "phone"}
+NORMALIZED_FIELDS = {"msisdn": "msisdn_norm", "phone": "phone_norm"}
 NUMERIC_INT_FIELDS = {"days_in_status", "subscription_fee"}
 NUMERIC_DEC_FIELDS = {"balance"}
 
@@ -75,7 +81,10 @@ ON DUPLICATE KEY UPDATE
   phone=VALUES(phone),
   status_call=VALUES(status_call),
   call_result=VALUES(call_result),
-  abonent_answer=VALUES(abonent_answer)
+  abonent_answer=VALUES(abonent_answer),
+  status_category=VALUES(status_category),
+  msisdn_norm=VALUES(msisdn_norm),
+  phone_norm=VALUES(phone_norm)
 """
 
 def _normalize_status(value) -> str:
@@ -148,13 +157,16 @@ def _make_engine():
 
 # -------- ORM upsert helpers --------
 def _choose_lookup(row: dict) -> tuple[str | None, str | None]:
-    """Приоритет ключа: msisdn -> account -> phone."""
+    """Приоритет ключа: msisdn -> account -> phone; для номеров — по нормализованной колонке."""
     for f in ("msisdn", "account", "phone"):
         v = row.get(f)
         if v is None:
             continue
         s = str(v).strip()
         if s:
+            norm_field = NORMALIZED_FIELDS.get(f)
+            if norm_field and row.get(norm_field):
+                return norm_field, row[norm_field]
             return f, s
     return None, None
 
@@ -195,7 +207,7 @@ def _orm_upsert_rows(rows: list[dict]) -> tuple[int, int, str]:
                 defaults=defaults,
             )
             ok += 1
-        except IntegrityError as e:
+        except (IntegrityError, Actives.MultipleObjectsReturned) as e:
             last_err = str(e)
             try:
                 with transaction.atomic():
@@ -242,6 +254,9 @@ def run_import(job_id: int):
         # приведение значений
         for c in COLUMNS:
             df[c] = df[c].map(lambda v: _coerce(v, c))
+        df["status_category"] = df["status"].map(classify_status)
+        for src, norm_field in NORMALIZED_FIELDS.items():
+            df[norm_field] = normalize_phone_series(df[src])
 
         # отбрасываем строки без всех трёх ключей
         keymask = (
@@ -300,6 +315,9 @@ def run_import(job_id: int):
                         last_error=last_err,
                     )
 
+        # строки могли уйти из Suspends или сменить msisdn — индекс дочитает их из БД
+        phone_index.discard(df["phone_norm"].dropna().unique())
+
         job.status = "done"
         job.last_error = last_err
         job.save(update_fields=["status", "last_error"])
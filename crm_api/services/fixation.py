@@ -0,0 +1,95 @@
+# crm_api/services/fixation.py
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from django.shortcuts import get_object_or_404
+
+from crm_api.models import Actives, Fixeds, Suspends, copy_to_fixeds
+
+BULK_BATCH = 500
+
+
+class MissingRecords(Exception):
+    def __init__(self, ids):
+        super().__init__(f"Записи не найдены: {ids}")
+        self.ids = ids
+
+
+class DuplicateRecords(Exception):
+    """В пачке несколько записей с одним msisdn: у пачки один fixed_at, в Fixeds они столкнутся."""
+
+    def __init__(self, ids):
+        super().__init__(f"Повторяющиеся msisdn у записей: {ids}")
+        self.ids = ids
+
+
+def _check_unique_msisdn(objs: dict):
+    by_msisdn = defaultdict(list)
+    for pk, obj in objs.items():
+        if obj.msisdn is not None:
+            by_msisdn[obj.msisdn].append(pk)
+    duplicates = sorted(pk for pks in by_msisdn.values() if len(pks) > 1 for pk in pks)
+    if duplicates:
+        raise DuplicateRecords(duplicates)
+
+
+def _lock_and_apply(qs, items: list[dict], user, now) -> tuple[dict, set]:
+    """Блокирует записи одним SELECT ... FOR UPDATE и применяет к ним поля фиксации."""
+    objs = qs.select_for_update().in_bulk([item["id"] for item in items])
+    missing = [item["id"] for item in items if item["id"] not in objs]
+    if missing:
+        raise MissingRecords(missing)
+
+    changed = {"fixed_by", "fixed_at", "updated_at"}
+    for item in items:
+        obj = objs[item["id"]]
+        for field, value in item.items():
+            if field == "id":
+                continue
+            setattr(obj, field, value)
+            changed.add(field)
+        obj.fixed_by = user
+        obj.fixed_at = now
+        obj.updated_at = now
+    return objs, changed
+
+
+def bulk_fix_actives(items: list[dict], user) -> list[Actives]:
+    """Фиксация пачки Actives: один bulk_update в одной транзакции."""
+    now = timezone.now()
+    with transaction.atomic():
+        objs, changed = _lock_and_apply(Actives.objects.all(), items, user, now)
+        Actives.objects.bulk_update(list(objs.values()), sorted(changed), batch_size=BULK_BATCH)
+    return list(objs.values())
+
+
+def bulk_fix_suspends(items: list[dict], user) -> list[int]:
+    """
+    Фиксация пачки Suspends: bulk_create в Fixeds и один DELETE ... WHERE id IN (...).
+    У всей пачки один fixed_at, поэтому записи с одинаковым msisdn не вставятся обе:
+    такая пачка отклоняется целиком (DuplicateRecords), ничего не меняя.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        objs, _ = _lock_and_apply(Suspends.objects.all(), items, user, now)
+        _check_unique_msisdn(objs)
+        copy_to_fixeds(list(objs.values()), batch_size=BULK_BATCH)
+    return list(objs)
+
+
+def fix_suspend(pk, data: dict, user) -> Fixeds:
+    """
+    Фиксация одной записи Suspends без UPDATE самой строки:
+    SELECT ... FOR UPDATE по pk, INSERT в Fixeds, DELETE.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        obj = get_object_or_404(Suspends.objects.select_for_update(), pk=pk)
+        for field, value in data.items():
+            setattr(obj, field, value)
+        obj.fixed_by = user
+        obj.fixed_at = now
+        obj.updated_at = now
+        return copy_to_fixeds([obj])[0]
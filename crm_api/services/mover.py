@@ -0,0 +1,56 @@
+# crm_api/services/mover.py
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from crm_api.models import MOVE_ENGINE_SQL, MoveJob, Suspends, move_suspends_with_status_call_to_fixeds
+
+CHUNK = 2000
+STALE_AFTER = timedelta(minutes=5)  # running без прогресса дольше — процесс умер, можно продолжать
+
+
+def find_resumable_job() -> MoveJob | None:
+    """Незавершённая задача: pending/failed или running, у которой давно не было прогресса."""
+    job = MoveJob.objects.exclude(status="done").order_by("-id").first()
+    if job and job.status == "running" and job.updated_at > timezone.now() - STALE_AFTER:
+        return None
+    return job
+
+
+def is_running() -> MoveJob | None:
+    return (MoveJob.objects
+            .filter(status="running", updated_at__gt=timezone.now() - STALE_AFTER)
+            .order_by("-id").first())
+
+
+def run_move_job(job_id: int):
+    job = MoveJob.objects.get(id=job_id)
+    job.status = "running"
+    job.last_error = ""
+    job.save(update_fields=["status", "last_error", "updated_at"])
+
+    base_moved = job.moved_rows
+    try:
+        remaining = (Suspends.objects
+                     .exclude(status_call__isnull=True).exclude(status_call="")
+                     .filter(pk__gt=job.last_pk).count())
+        MoveJob.objects.filter(id=job.id).update(total_rows=base_moved + remaining, updated_at=timezone.now())
+
+        def on_chunk(last_pk, moved):
+            MoveJob.objects.filter(id=job.id).update(
+                last_pk=last_pk, moved_rows=base_moved + moved, updated_at=timezone.now(),
+            )
+
+        move_suspends_with_status_call_to_fixeds(
+            chunk_size=CHUNK,
+            ignore_duplicates=True,
+            start_after_pk=job.last_pk,
+            on_chunk=on_chunk,
+            engine=MOVE_ENGINE_SQL,
+        )
+        MoveJob.objects.filter(id=job.id).update(
+            status="done", finished_at=timezone.now(), total_rows=F("moved_rows"),
+        )
+    except Exception as e:
+        MoveJob.objects.filter(id=job.id).update(status="failed", last_error=str(e))
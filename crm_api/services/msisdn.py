@@ -0,0 +1,239 @@
+# crm_api/services/msisdn.py
+import csv
+import io
+import sys
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from crm_api.models import Suspends
+from crm_api.services.phones import normalize_phone
+from crm_api.services.tokens import cache_is_shared
+
+RESOLVE_CHUNK = 5000
+
+
+def lookup_msisdns(phones, with_pk: bool = False) -> dict:
+    """
+    phone_norm -> msisdn по Suspends; WHERE phone_norm IN (...) чанками, первая запись по pk.
+    with_pk — значения (pk, msisdn), для phone_index.
+    """
+    phones = list(phones)
+    found = {}
+    for start in range(0, len(phones), RESOLVE_CHUNK):
+        rows = (
+            Suspends.objects
+            .filter(phone_norm__in=phones[start:start + RESOLVE_CHUNK])
+            .exclude(msisdn__isnull=True)
+            .exclude(msisdn="")
+            .order_by("pk")
+            .values_list("pk", "phone_norm", "msisdn")
+        )
+        for pk, phone, msisdn in rows:
+            found.setdefault(phone, (pk, msisdn) if with_pk else msisdn)
+    return found
+
+
+class PhoneIndex:
+    """
+    Тёплый словарь phone_norm -> (pk, msisdn) по Suspends.
+
+    В общем кэше лежит снимок (generation, mapping) и журнал изменений к нему:
+    счётчик seq + delta-записи {phone: None} (номер сброшен). Каждый процесс держит
+    локальную копию и на каждом lookup дочитывает только новые delta.
+    Попадания перепроверяются одним запросом по pk (строка ещё в Suspends, номер и msisdn те же) —
+    индекс не отдаёт устаревшее, даже если сброс не дошёл. Промах — запрос в БД по phone_norm.
+    Без общего кэша (cache_is_shared) журнал не виден другим воркерам — тогда всегда БД.
+    """
+    SNAPSHOT_KEY = "crm:phone_index:v2:snapshot"
+    GENERATION_KEY = "crm:phone_index:v2:generation"
+    COMPACT_LOCK_KEY = "crm:phone_index:compact"
+    COMPACT_EVERY = 500
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._map: dict[str, str] = {}
+        self._generation = None
+        self._seq = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _seq_key(generation) -> str:
+        return f"crm:phone_index:{generation}:seq"
+
+    @staticmethod
+    def _delta_key(generation, n: int) -> str:
+        return f"crm:phone_index:{generation}:delta:{n}"
+
+    def _build(self) -> dict[str, tuple[int, str]]:
+        mapping = {}
+        rows = (
+            Suspends.objects
+            .exclude(phone_norm__isnull=True)
+            .exclude(msisdn__isnull=True)
+            .exclude(msisdn="")
+            .order_by("-pk")
+            .values_list("pk", "phone_norm", "msisdn")
+        )
+        # идём от больших pk к меньшим: остаётся первая запись по pk, как в lookup_msisdns
+        for pk, phone, msisdn in rows.iterator(chunk_size=20000):
+            mapping[phone] = (pk, msisdn)
+        return mapping
+
+    def _publish(self, mapping: dict[str, tuple[int, str]]) -> str:
+        generation = uuid.uuid4().hex
+        cache.set(self.SNAPSHOT_KEY, (generation, mapping), None)
+        cache.set(self._seq_key(generation), 0, None)
+        cache.set(self.GENERATION_KEY, generation, None)
+        return generation
+
+    def _apply(self, changes: dict):
+        for phone, msisdn in changes.items():
+            if msisdn is None:
+                self._map.pop(phone, None)
+            else:
+                self._map[phone] = msisdn
+
+    def _sync(self):
+        generation = cache.get(self.GENERATION_KEY)
+        with self._lock:
+            if generation is None:
+                self._map = self._build()
+                self._generation, self._seq = self._publish(self._map), 0
+                return
+            if generation != self._generation:
+                snapshot = cache.get(self.SNAPSHOT_KEY)
+                if snapshot is None or snapshot[0] != generation:
+                    # снимок вытеснен/перезаписан — собираем заново
+                    cache.delete(self.GENERATION_KEY)
+                    return self._sync()
+                self._generation, self._map, self._seq = generation, snapshot[1], 0
+
+            seq = cache.get(self._seq_key(generation)) or 0
+            if seq <= self._seq:
+                return
+            keys = [self._delta_key(generation, n) for n in range(self._seq + 1, seq + 1)]
+            deltas = cache.get_many(keys)
+            for key in keys:
+                if key not in deltas:
+                    break  # delta ещё не записана другим процессом — дочитаем в следующий раз
+                self._apply(deltas[key])
+                self._seq += 1
+
+    def _push(self, changes: dict):
+        if not changes:
+            return
+        with self._lock:
+            self._apply(changes)
+        generation = cache.get(self.GENERATION_KEY)
+        if generation is None:
+            return  # индекса ещё нет — соберётся из БД при первом lookup
+        try:
+            n = cache.incr(self._seq_key(generation))
+        except ValueError:
+            cache.delete(self.GENERATION_KEY)
+            return
+        cache.set(self._delta_key(generation, n), changes, None)
+        if n >= self.COMPACT_EVERY and cache.add(self.COMPACT_LOCK_KEY, 1, 60):
+            try:
+                self._sync()
+                with self._lock:
+                    self._generation, self._seq = self._publish(dict(self._map)), 0
+            finally:
+                cache.delete(self.COMPACT_LOCK_KEY)
+
+    def _verified(self, cached: dict) -> dict[str, str]:
+        """Попадания, которые всё ещё верны: один SELECT ... WHERE id IN (...)."""
+        rows = (
+            Suspends.objects
+            .filter(pk__in=[pk for pk, _ in cached.values()])
+            .values_list("pk", "phone_norm", "msisdn")
+        )
+        current = {pk: (phone, msisdn) for pk, phone, msisdn in rows}
+        return {
+            phone: msisdn for phone, (pk, msisdn) in cached.items()
+            if msisdn and current.get(pk) == (phone, msisdn)
+        }
+
+    def lookup_many(self, phones) -> dict[str, str]:
+        phones = list(phones)
+        if not cache_is_shared():
+            return lookup_msisdns(phones)
+        self._sync()
+        cached = {}
+        with self._lock:
+            for phone in phones:
+                entry = self._map.get(phone)
+                if entry is not None:
+                    cached[phone] = entry
+        found = self._verified(cached) if cached else {}
+        missing = [phone for phone in phones if phone not in found]
+        stale = [phone for phone in cached if phone not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        if stale:
+            self.discard(stale)
+        if missing:
+            from_db = lookup_msisdns(missing, with_pk=True)
+            if from_db:
+                found.update((phone, msisdn) for phone, (_, msisdn) in from_db.items())
+                with self._lock:
+                    self._map.update(from_db)
+        return found
+
+    def __contains__(self, phone) -> bool:
+        return phone in self._map
+
+    def discard(self, phones):
+        """Номера ушли из Suspends или изменились (фиксация, перенос, правка, удаление, импорт)."""
+        self._push({p: None for p in phones if p})
+
+    def stats(self) -> dict:
+        self._sync()
+        with self._lock:
+            size = sys.getsizeof(self._map) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._map.items()
+            )
+            return {
+                "entries": len(self._map),
+                "bytes": size,
+                "generation": self._generation,
+                "seq": self._seq,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+phone_index = PhoneIndex()
+
+
+def iter_resolved(numbers, chunk_size: int = RESOLVE_CHUNK):
+    """
+    (number, phone_norm, msisdn | None) в порядке входа.
+    Сначала phone_index, промахи — один IN-запрос на чанк;
+    номера, уже найденные в предыдущих чанках, повторно не ищутся.
+    """
+    resolved: dict[str, str | None] = {}
+    for start in range(0, len(numbers), chunk_size):
+        chunk = [(n, normalize_phone(n)) for n in numbers[start:start + chunk_size]]
+        missing = {norm for _, norm in chunk if norm and norm not in resolved}
+        if missing:
+            found = phone_index.lookup_many(missing)
+            for norm in missing:
+                resolved[norm] = found.get(norm)
+        for n, norm in chunk:
+            yield n, norm, (resolved[norm] if norm else None)
+
+
+def read_numbers_csv(f) -> list[str]:
+    """Номера из первой колонки CSV; заголовок (нечисловая первая строка) пропускается."""
+    numbers = []
+    reader = csv.reader(io.TextIOWrapper(getattr(f, "file", f), encoding="utf-8-sig", newline=""))
+    for i, row in enumerate(reader):
+        cell = (row[0] if row else "").strip()
+        if not cell or (i == 0 and normalize_phone(cell) is None):
+            continue
+        numbers.append(cell)
+    return numbers
@@ -0,0 +1,223 @@
+# crm_api/services/operator_stats.py
+from collections import Counter
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from crm_api.models import Fixeds, OperatorDailyStat
+
+# Fixeds без fixed_at попадают в этот день: в today/week/month не входят, в total — да
+UNDATED = date(1970, 1, 1)
+ROLLUP_FIELDS = {"fixed_by", "fixed_by_id", "fixed_at", "status_call", "call_result"}
+
+# поколения кэша статистики: today — при записях за сегодня, history — при правках прошлых дней
+TODAY_GENERATION_KEY = "crm:stats:gen:today"
+HISTORY_GENERATION_KEY = "crm:stats:gen:history"
+# персональные поколения (stats/general, stats/daily); users — когда затронутые операторы неизвестны
+ALL_USERS_GENERATION_KEY = "crm:stats:gen:users"
+USER_STATS_TTL = 30
+
+_UPSERT_INSERT = "INSERT INTO {table} (user_id, day, status_call, call_result, count) {source} "
+_UPSERT_CONFLICT = {
+    "mysql": "ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+}
+# SQLite/PostgreSQL (тесты, локальный запуск)
+_UPSERT_CONFLICT_DEFAULT = (
+    "ON CONFLICT (user_id, day, status_call, call_result) DO UPDATE SET count = {table}.count + excluded.count"
+)
+
+
+def _upsert_sql(source: str) -> str:
+    """count += delta по уникальному ключу свёртки; синтаксис upsert — под текущую БД."""
+    table = connection.ops.quote_name(OperatorDailyStat._meta.db_table)
+    conflict = _UPSERT_CONFLICT.get(connection.vendor, _UPSERT_CONFLICT_DEFAULT)
+    return (_UPSERT_INSERT + conflict).format(table=table, source=source)
+
+
+def _row_key(fixed_by_id, fixed_at, status_call, call_result) -> tuple:
+    day = fixed_at.date() if fixed_at else UNDATED
+    return fixed_by_id, day, status_call or "", call_result or ""
+
+
+def key_of(obj: Fixeds) -> tuple:
+    return _row_key(obj.fixed_by_id, obj.fixed_at, obj.status_call, obj.call_result)
+
+
+def stored_key(pk) -> tuple | None:
+    """Ключ свёртки для строки Fixeds в том виде, в каком она сейчас лежит в БД."""
+    row = (
+        Fixeds.objects.filter(pk=pk)
+        .values_list("fixed_by_id", "fixed_at", "status_call", "call_result")
+        .first()
+    )
+    return _row_key(*row) if row else None
+
+
+def generation(key: str) -> int:
+    return cache.get_or_set(key, 0, None)
+
+
+def _bump(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _user_generation_key(user_id) -> str:
+    return f"crm:stats:gen:user:{user_id}"
+
+
+def _invalidate(days=None, user_ids=None):
+    """None — неизвестно, какие дни/операторы затронуты (set-based перенос): сбрасываем всё."""
+    today = timezone.now().date()
+    if days is None or today in days:
+        _bump(TODAY_GENERATION_KEY)
+    if days is None or any(d != today for d in days):
+        _bump(HISTORY_GENERATION_KEY)
+    if user_ids is None:
+        _bump(ALL_USERS_GENERATION_KEY)
+    else:
+        for user_id in user_ids:
+            _bump(_user_generation_key(user_id))
+
+
+def _cached_for_user(user_id, name: str, compute):
+    """Короткий кэш персональной статистики; сбрасывается фиксацией этого оператора."""
+    gen_keys = [ALL_USERS_GENERATION_KEY, _user_generation_key(user_id)]
+    gens = cache.get_many(gen_keys)
+    key = f"crm:stats:{name}:{user_id}:" + ":".join(str(gens.get(k, 0)) for k in gen_keys)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, USER_STATS_TTL)
+    return data
+
+
+def apply_deltas(deltas: Counter):
+    """Один upsert на пачку: count += delta по ключу (user, day, status_call, call_result)."""
+    rows = [(*key, n) for key, n in deltas.items() if n and key[0] is not None]  # без оператора не считаем
+    if not rows:
+        return
+    sql = _upsert_sql("VALUES (%s, %s, %s, %s, %s)")
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    days = {row[1] for row in rows}
+    user_ids = {row[0] for row in rows}
+    transaction.on_commit(lambda: _invalidate(days, user_ids))
+
+
+def record(keys, sign: int = 1):
+    apply_deltas(Counter({key: sign * n for key, n in Counter(keys).items()}))
+
+
+def record_change(old_key, new_key):
+    """Создание (old_key=None) или изменение строки Fixeds."""
+    if old_key == new_key:
+        return
+    deltas = Counter({new_key: 1})
+    if old_key:
+        deltas[old_key] -= 1
+    apply_deltas(deltas)
+
+
+def record_from_table(cursor, table: str, where: str, params):
+    """
+    Свёртка строк, перенесённых set-based движком: INSERT ... SELECT ... GROUP BY
+    по Fixeds с moved_at этого INSERT (индекс по moved_at).
+    """
+    source = (
+        f"SELECT fixed_by_id, COALESCE(DATE(fixed_at), %s), COALESCE(status_call, ''), "
+        f"COALESCE(call_result, ''), COUNT(*) FROM {table} "
+        f"WHERE {where} AND fixed_by_id IS NOT NULL GROUP BY 1, 2, 3, 4"
+    )
+    cursor.execute(
+        _upsert_sql(source),
+        [UNDATED, *params],
+    )
+    transaction.on_commit(_invalidate)
+
+
+def rebuild() -> int:
+    """Пересчёт свёртки с нуля по Fixeds (починка расхождений)."""
+    rows = (
+        Fixeds.objects.exclude(fixed_by__isnull=True)
+        .values_list("fixed_by_id", "fixed_date", "status_call", "call_result")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    deltas = Counter()
+    for fixed_by_id, day, status_call, call_result, n in rows.iterator(chunk_size=5000):
+        # NULL и "" сходятся в один ключ
+        deltas[(fixed_by_id, day or UNDATED, status_call or "", call_result or "")] += n
+    with transaction.atomic():
+        OperatorDailyStat.objects.all().delete()
+        OperatorDailyStat.objects.bulk_create(
+            [
+                OperatorDailyStat(user_id=u, day=d, status_call=sc, call_result=cr, count=n)
+                for (u, d, sc, cr), n in deltas.items()
+            ],
+            batch_size=5000,
+        )
+    _invalidate()
+    return len(deltas)
+
+
+def period_starts(now=None) -> dict[str, date]:
+    today = (now or timezone.now()).date()
+    return {
+        "today": today,
+        "week": today - timedelta(days=today.weekday()),  # понедельник
+        "month": today.replace(day=1),
+    }
+
+
+def operator_summary(user_id) -> dict:
+    """today/week/month/total и разбивка по status_call — два запроса по свёртке."""
+    starts = period_starts()
+
+    def compute():
+        qs = OperatorDailyStat.objects.filter(user_id=user_id)
+        aggregates = {name: Sum("count", filter=Q(day__gte=start)) for name, start in starts.items()}
+        general = qs.aggregate(**aggregates, total=Sum("count"))
+        by_status = qs.values("status_call").annotate(count=Sum("count")).order_by()
+        return {
+            "general": {name: value or 0 for name, value in general.items()},
+            "by_status_call": {
+                row["status_call"] or "не указано": row["count"] for row in by_status if row["count"]
+            },
+        }
+
+    return _cached_for_user(user_id, f"general:{starts['today']}", compute)
+
+
+def operator_daily(user_id, date_from: date, date_to: date, branch: str | None = None) -> list[dict]:
+    """
+    Фиксации по дням за период. Без филиала — по свёртке; с филиалом — GROUP BY fixed_date
+    по Fixeds с индексом (fixed_by, fixed_date).
+    """
+    def compute():
+        if branch:
+            rows = (
+                Fixeds.objects
+                .filter(fixed_by_id=user_id, fixed_date__gte=date_from, fixed_date__lte=date_to, branches=branch)
+                .values(day=F("fixed_date"))
+                .annotate(count=Count("id"))
+                .order_by("day")
+            )
+        else:
+            rows = (
+                OperatorDailyStat.objects
+                .filter(user_id=user_id, day__gte=date_from, day__lte=date_to)
+                .values("day")
+                .annotate(count=Sum("count"))
+                .order_by("day")
+            )
+        return [
+            {"date": row["day"].strftime("%Y-%m-%d"), "count": row["count"]} for row in rows if row["count"]
+        ]
+
+    return _cached_for_user(user_id, f"daily:{date_from}:{date_to}:{branch or ''}", compute)
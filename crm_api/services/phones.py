@@ -0,0 +1,50 @@
+# crm_api/services/phones.py
+import re
+
+import pandas as pd
+
+COUNTRY_CODE = "998"
+LOCAL_NUMBER_LEN = 9
+FULL_NUMBER_LEN = len(COUNTRY_CODE) + LOCAL_NUMBER_LEN
+MAX_NUMBER_LEN = 15  # E.164
+
+_FLOAT_TAIL_RE = re.compile(r"\.0+$")
+_SEPARATORS_RE = re.compile(r"[\s\-()+]")
+
+
+def normalize_phone(value) -> str | None:
+    """
+    Канонический номер (E.164 без '+'): только цифры, с кодом страны.
+    '+998 90 123-45-67', '901234567', '998901234567.0' -> '998901234567'.
+    Нечисловые значения -> None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        value = int(value)
+    s = _SEPARATORS_RE.sub("", _FLOAT_TAIL_RE.sub("", str(value).strip()))
+    if s.startswith("00"):
+        s = s[2:]
+    if not s.isdigit():
+        return None
+    if len(s) == LOCAL_NUMBER_LEN:
+        s = COUNTRY_CODE + s
+    return s if len(s) <= MAX_NUMBER_LEN else None
+
+
+def normalize_phone_series(values: pd.Series) -> pd.Series:
+    """Векторная версия normalize_phone для колонок DataFrame."""
+    s = values.astype("string").str.strip()
+    s = s.str.replace(_FLOAT_TAIL_RE.pattern, "", regex=True)
+    s = s.str.replace(_SEPARATORS_RE.pattern, "", regex=True)
+    s = s.str.replace(r"^00", "", regex=True)
+    s = s.where(s.str.fullmatch(r"\d+").fillna(False))
+    s = s.mask(s.str.len() == LOCAL_NUMBER_LEN, COUNTRY_CODE + s)
+    s = s.where(s.str.len() <= MAX_NUMBER_LEN)
+    return s.astype(object).where(s.notna(), None)
+
+
+def is_full_number(normalized: str | None) -> bool:
+    return bool(normalized) and len(normalized) >= FULL_NUMBER_LEN
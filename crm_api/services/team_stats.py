@@ -0,0 +1,89 @@
+# crm_api/services/team_stats.py
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from crm_api.models import Fixeds, User
+from crm_api.services.operator_stats import HISTORY_GENERATION_KEY, TODAY_GENERATION_KEY, generation
+
+MAX_RANGE_DAYS = 366
+CACHE_TTL = 60 * 60  # страховка; актуальность держится поколениями
+NO_STATUS = "не указано"
+NO_BRANCH = "не указано"
+
+
+def _cache_key(date_from: date, date_to: date) -> str:
+    # прошлые периоды меняются только при правках истории; текущий день — при каждой фиксации
+    parts = [f"h{generation(HISTORY_GENERATION_KEY)}"]
+    if date_to >= timezone.now().date():
+        parts.append(f"t{generation(TODAY_GENERATION_KEY)}")
+    return f"crm:team_stats:{date_from}:{date_to}:{':'.join(parts)}"
+
+
+def _operator_names(ids) -> dict[int, str]:
+    return {
+        pk: fio or username
+        for pk, fio, username in User.objects.filter(pk__in=ids).values_list("pk", "fio", "username")
+    }
+
+
+def _compute(date_from: date, date_to: date) -> dict:
+    rows = (
+        Fixeds.objects
+        .filter(fixed_date__gte=date_from, fixed_date__lte=date_to, fixed_by__isnull=False)
+        .values_list("fixed_by_id", "fixed_date", "status_call", "branches")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    operators = defaultdict(lambda: {"total": 0, "by_status_call": Counter(), "by_day": defaultdict(Counter)})
+    branches = defaultdict(lambda: {"total": 0, "by_status_call": Counter()})
+    total = 0
+    for user_id, day, status_call, branch, n in rows:
+        status_call = status_call or NO_STATUS
+        op = operators[user_id]
+        op["total"] += n
+        op["by_status_call"][status_call] += n
+        op["by_day"][day.strftime("%Y-%m-%d")][status_call] += n
+        br = branches[branch or NO_BRANCH]
+        br["total"] += n
+        br["by_status_call"][status_call] += n
+        total += n
+
+    names = _operator_names(operators)
+    leaderboard = sorted(operators.items(), key=lambda item: -item[1]["total"])
+    return {
+        "date_from": date_from.strftime("%Y-%m-%d"),
+        "date_to": date_to.strftime("%Y-%m-%d"),
+        "total": total,
+        "operators": [
+            {
+                "id": user_id,
+                "name": names.get(user_id, ""),
+                "total": op["total"],
+                "by_status_call": dict(op["by_status_call"]),
+                "by_day": {d: dict(c) for d, c in sorted(op["by_day"].items())},
+            }
+            for user_id, op in leaderboard
+        ],
+        "branches": {
+            name: {"total": br["total"], "by_status_call": dict(br["by_status_call"])}
+            for name, br in sorted(branches.items(), key=lambda item: -item[1]["total"])
+        },
+    }
+
+
+def team_stats(date_from: date, date_to: date) -> dict:
+    """
+    Матрицы оператор × день × status_call и разбивка по филиалам за период —
+    один GROUP BY по Fixeds, результат кэшируется на период.
+    """
+    key = _cache_key(date_from, date_to)
+    data = cache.get(key)
+    if data is None:
+        data = _compute(date_from, date_to)
+        cache.set(key, data, CACHE_TTL)
+    return data
@@ -0,0 +1,283 @@
+# crm_api/services/tokens.py
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_to_epoch
+
+log = logging.getLogger(__name__)
+
+VERIFY_CACHE_SIZE = 5000
+BLACKLIST_GENERATION_KEY = "crm:tokens:blacklist_gen"
+BLACKLIST_ID_OVERLAP = 50  # перечитываем хвост по id: строки параллельных транзакций коммитятся не по порядку id
+BLACKLIST_COMPACT_EVERY = 10 * 60
+BLACKLIST_RESYNC_EVERY = 30  # дочитываем и без смены поколения: сигнал не приходит на bulk_create и правки мимо ORM
+PRUNE_LOCK_KEY = "crm:tokens:prune"
+PRUNE_EVERY = 60 * 60
+PRUNE_CHUNK = 5000
+
+
+class TokenInvalid(Exception):
+    pass
+
+
+def _build_backend() -> TokenBackend:
+    return TokenBackend(
+        algorithm=api_settings.ALGORITHM,
+        signing_key=api_settings.SIGNING_KEY,
+        verifying_key=api_settings.VERIFYING_KEY,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        jwk_url=api_settings.JWK_URL,
+        leeway=api_settings.LEEWAY,
+    )
+
+
+# собирается один раз на процесс, а не на каждый запрос
+token_backend = _build_backend()
+
+
+def cache_is_shared() -> bool:
+    """
+    Кэш общий для всех воркеров. Поколения/версии и флаги отключения в LocMem видит только
+    процесс, который их поднял, — на таком кэше межзапросные кэши проверок не включаются.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    return not backend.endswith((".LocMemCache", ".DummyCache"))
+
+
+def _user_version_key(user_id) -> str:
+    return f"crm:tokens:user:{user_id}:v"
+
+
+def bump_version(key: str):
+    """
+    Новое случайное значение, а не incr: у файлового кэша incr — это get+set, и два параллельных
+    bump дали бы одно значение — изменение, закэшированное между ними, осталось бы невидимым.
+    """
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+def bump_blacklist_generation():
+    """Любое изменение блэклиста сбрасывает все закэшированные проверки."""
+    bump_version(BLACKLIST_GENERATION_KEY)
+
+
+def bump_user_version(user_id):
+    """Пользователь изменился (роль, активность, ФИО) — его проверки пересчитываются."""
+    bump_version(_user_version_key(user_id))
+
+
+def _disabled_key(user_id) -> str:
+    return f"crm:auth:disabled:{user_id}"
+
+
+def set_user_disabled(user_id, disabled: bool):
+    """Отключённый/удалённый пользователь: claims-аутентификация не пускает его до истечения access-токена."""
+    if disabled:
+        cache.set(_disabled_key(user_id), True, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+    else:
+        cache.delete(_disabled_key(user_id))
+
+
+def is_user_disabled(user_id) -> bool:
+    return bool(cache.get(_disabled_key(user_id)))
+
+
+def _blacklist_installed() -> bool:
+    return "rest_framework_simplejwt.token_blacklist" in settings.INSTALLED_APPS
+
+
+class BlacklistIndex:
+    """
+    jti -> exp отозванных и ещё не истёкших токенов, в памяти процесса.
+    Новые строки BlacklistedToken дочитываются по id (без JOIN на каждый refresh):
+    на общем кэше — после смены поколения или раз в BLACKLIST_RESYNC_EVERY,
+    на кэше процесса (cache_is_shared() == False) — при каждой проверке.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis: dict[str, int] = {}
+        self._last_id = 0
+        self._loaded = False
+        self._generation = None
+        self._synced_at = 0.0
+        self._compacted_at = time.time()
+
+    def _fresh(self, shared: bool, generation) -> bool:
+        return (
+            shared and self._loaded and generation == self._generation
+            and time.time() - self._synced_at < BLACKLIST_RESYNC_EVERY
+        )
+
+    def _sync(self):
+        shared = cache_is_shared()
+        generation = cache.get(BLACKLIST_GENERATION_KEY, 0) if shared else None
+        if self._fresh(shared, generation):
+            return
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        with self._lock:
+            if self._fresh(shared, generation):
+                return
+            now = time.time()
+            qs = BlacklistedToken.objects.filter(id__gt=max(self._last_id - BLACKLIST_ID_OVERLAP, 0))
+            if not self._loaded:
+                qs = qs.filter(token__expires_at__gt=aware_utcnow())  # первая загрузка — без истории
+            for pk, jti, expires_at in qs.order_by("id").values_list("id", "token__jti", "token__expires_at"):
+                self._jtis[jti] = datetime_to_epoch(expires_at)
+                self._last_id = max(self._last_id, pk)
+            self._loaded = True
+            self._generation = generation
+            self._synced_at = now
+
+            if now - self._compacted_at > BLACKLIST_COMPACT_EVERY:
+                self._jtis = {jti: exp for jti, exp in self._jtis.items() if exp > now}
+                self._compacted_at = now
+
+    def contains(self, jti) -> bool:
+        self._sync()
+        return jti in self._jtis
+
+    def stats(self) -> dict:
+        return {"entries": len(self._jtis), "last_id": self._last_id, "generation": self._generation}
+
+
+blacklist_index = BlacklistIndex()
+
+
+def is_blacklisted(jti) -> bool:
+    if not jti or not _blacklist_installed():
+        return False
+    return blacklist_index.contains(jti)
+
+
+def prune_expired_tokens() -> int:
+    """Удаляет истёкшие OutstandingToken (и их BlacklistedToken каскадом) чанками по id."""
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+    deleted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+            .order_by("id")
+            .values_list("id", flat=True)[:PRUNE_CHUNK]
+        )
+        if not ids:
+            break
+        deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+    if deleted:
+        bump_blacklist_generation()
+    return deleted
+
+
+def _prune_job():
+    try:
+        deleted = prune_expired_tokens()
+        log.info("Pruned %s expired token rows", deleted)
+    except Exception:
+        log.exception("Token pruning failed")
+        cache.delete(PRUNE_LOCK_KEY)  # повторим при следующем refresh
+    finally:
+        connection.close()
+
+
+def maybe_prune_in_background():
+    """Не чаще раза в PRUNE_EVERY на все процессы: замок в кэше, чистка — в фоновом потоке."""
+    if _blacklist_installed() and cache.add(PRUNE_LOCK_KEY, 1, PRUNE_EVERY):
+        threading.Thread(target=_prune_job, daemon=True).start()
+
+
+def _load_user_info(user_id):
+    from crm_api.models import User
+    from crm_api.serializers import MeSerializer
+
+    user = (
+        User.objects.filter(pk=user_id)
+        .only("id", "username", "first_name", "last_name", "fio", "is_staff", "is_superuser")
+        .first()
+    )
+    return MeSerializer(user).data if user else None
+
+
+class VerifiedTokenCache:
+    """
+    LRU token -> (payload, user_info) на оставшееся время жизни токена.
+    Запись действительна, пока не изменились поколение блэклиста и версия пользователя;
+    без общего кэша версии не видны другим воркерам, и каждая проверка идёт заново.
+    """
+
+    def __init__(self, maxsize: int = VERIFY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _versions(user_id) -> tuple:
+        keys = [BLACKLIST_GENERATION_KEY, _user_version_key(user_id)]
+        values = cache.get_many(keys)
+        return tuple(values.get(k, 0) for k in keys)
+
+    def _get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, versions, result = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+        if versions != self._versions(result[0].get(api_settings.USER_ID_CLAIM)):
+            return None
+        return result
+
+    def _put(self, token: str, expires_at, versions, result):
+        with self._lock:
+            self._entries[token] = (expires_at, versions, result)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def verify(self, token: str) -> tuple[dict, dict | None]:
+        """(payload, user_info); TokenInvalid — просрочен, подпись не сошлась или в блэклисте."""
+        cacheable = cache_is_shared()
+        result = self._get(token) if cacheable else None
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        try:
+            payload = token_backend.decode(token, verify=True)
+        except TokenBackendError as e:
+            raise TokenInvalid(str(e))
+        if api_settings.TOKEN_TYPE_CLAIM not in payload or api_settings.JTI_CLAIM not in payload:
+            raise TokenInvalid("Token has no type or id")
+
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        versions = self._versions(user_id)  # до чтения БД: изменение во время проверки не закэшируется
+        if is_blacklisted(payload[api_settings.JTI_CLAIM]):
+            raise TokenInvalid("Token is blacklisted")
+        result = (payload, _load_user_info(user_id) if user_id else None)
+        if cacheable:
+            self._put(token, payload.get("exp", 0), versions, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+verified_tokens = VerifiedTokenCache()
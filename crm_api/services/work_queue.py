@@ -0,0 +1,50 @@
+# crm_api/services/work_queue.py
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from crm_api.models import Actives, Suspends
+
+CLAIM_LEASE = timedelta(minutes=15)
+MAX_CLAIM = 50
+CLAIM_ORDERINGS = {
+    "branch": ("branches", "pk"),
+    "days": ("-days_in_status", "pk"),
+}
+DEFAULT_ORDERING = ("pk",)
+
+
+def claim_next(user, count: int = 1, order: str | None = None, branch: str | None = None) -> list[Actives]:
+    """
+    Выдаёт оператору до count необзвоненных Suspends с арендой на CLAIM_LEASE.
+    SELECT ... FOR UPDATE SKIP LOCKED: параллельные операторы не ждут друг друга
+    и не получают одни и те же строки. Свои незакрытые записи выдаются повторно с продлением аренды.
+    """
+    now = timezone.now()
+    ordering = CLAIM_ORDERINGS.get(order, DEFAULT_ORDERING)
+    count = max(1, min(count, MAX_CLAIM))
+
+    qs = (
+        Suspends.objects
+        .filter(Q(status_call__isnull=True) | Q(status_call=""))
+        .filter(Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lt=now) | Q(claimed_by=user))
+    )
+    if branch:
+        qs = qs.filter(branches=branch)
+
+    with transaction.atomic():
+        ids = list(
+            qs.select_for_update(skip_locked=True)
+            .order_by(*ordering)
+            .values_list("pk", flat=True)[:count]
+        )
+        if ids:
+            Actives.objects.filter(pk__in=ids).update(claimed_by=user, claim_expires_at=now + CLAIM_LEASE)
+
+    return list(Actives.objects.select_related("fixed_by").filter(pk__in=ids).order_by(*ordering))
+
+
+def release_claims(user) -> int:
+    return Actives.objects.filter(claimed_by=user).update(claimed_by=None, claim_expires_at=None)
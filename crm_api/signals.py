@@ -0,0 +1,57 @@
+# crm_api/signals.py
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from crm_api.backends import bump_permissions_version
+from crm_api.models import Actives, Suspends, User
+from crm_api.services import tokens
+from crm_api.services.msisdn import phone_index
+
+
+# только post_save: post_delete заставил бы каскадное удаление при чистке грузить строки по одной;
+# prune_expired_tokens сам поднимает поколение
+@receiver(post_save, sender=BlacklistedToken)
+def blacklist_changed(sender, **kwargs):
+    tokens.bump_blacklist_generation()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return  # вход пользователя (UPDATE_LAST_LOGIN) на данные в токене не влияет
+    tokens.bump_user_version(instance.pk)
+    tokens.set_user_disabled(instance.pk, not instance.is_active)
+    bump_permissions_version(instance.pk)  # is_active / is_superuser
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    tokens.bump_user_version(instance.pk)
+    tokens.set_user_disabled(instance.pk, True)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_permissions_version()
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Permission)
+def permission_objects_changed(sender, **kwargs):
+    bump_permissions_version()
+
+
+# удаление — в Actives.delete(): post_delete отключил бы быстрый DELETE при переносе в Fixeds
+@receiver(post_save, sender=Actives)
+@receiver(post_save, sender=Suspends)
+def actives_saved(sender, instance, **kwargs):
+    """Статус или номер могли смениться: следующий lookup возьмёт номер из БД."""
+    phone = instance.phone_norm
+    if phone in phone_index:
+        transaction.on_commit(lambda: phone_index.discard([phone]))
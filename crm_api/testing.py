@@ -0,0 +1,42 @@
+# crm_api/testing.py
+# помощники для тестов и проверочных команд (check_query_counts): число SQL-запросов view
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+def _format_queries(ctx) -> str:
+    return "\n".join(f"{n}. {q['sql']}" for n, q in enumerate(ctx.captured_queries, start=1))
+
+
+@contextmanager
+def assert_max_queries(limit: int, using=connection):
+    """Блок выполняет не больше limit запросов; иначе AssertionError со списком SQL."""
+    with CaptureQueriesContext(using) as ctx:
+        yield ctx
+    if len(ctx) > limit:
+        raise AssertionError(f"{len(ctx)} queries executed, {limit} expected at most:\n{_format_queries(ctx)}")
+
+
+def page_query_counts(view, path: str, user, page_sizes, **params) -> list[int]:
+    """Число запросов list-view для каждого page_size (ответ рендерится: ленивые поля тоже считаются)."""
+    factory = APIRequestFactory()
+    counts = []
+    for size in page_sizes:
+        request = factory.get(path, {**params, "page_size": size})
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            view(request).render()
+        counts.append(len(ctx.captured_queries))
+    return counts
+
+
+def assert_constant_queries(view, path: str, user, page_sizes, **params) -> list[int]:
+    """Число запросов не зависит от размера страницы (нет N+1)."""
+    counts = page_query_counts(view, path, user, page_sizes, **params)
+    if len(set(counts)) != 1:
+        sizes = ", ".join(f"page_size={s} -> {c}" for s, c in zip(page_sizes, counts))
+        raise AssertionError(f"Query count depends on page size for {path}: {sizes}")
+    return counts
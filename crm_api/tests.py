@@ -0,0 +1,341 @@
+import re
+import tempfile
+import zlib
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from crm_api.auth import CrmRefreshToken, MyTokenObtainPairSerializer
+from crm_api.management.commands.check_query_counts import LIST_ENDPOINTS
+from crm_api.middleware import CompressionMiddleware
+from crm_api.serializers import DUPLICATE_FIXED_MESSAGE
+from crm_api.models import (
+    FIXEDS_COPY_FIELDS, MOVE_ENGINE_PYTHON, MOVE_ENGINE_SQL, STATUS_CATEGORY_ACTIVE,
+    Actives, Fixeds, OperatorDailyStat, Suspends, User,
+    copy_to_fixeds, move_suspends_with_status_call_to_fixeds,
+)
+from crm_api.services import tokens
+from crm_api.services.msisdn import phone_index
+from crm_api.testing import assert_constant_queries, assert_max_queries
+
+BASE_TIME = datetime(2026, 10, 1, 9, 30, 15, 123456)
+
+
+def make_suspend(n, **extra):
+    data = {
+        "msisdn": f"99890{n:07d}",
+        "phone": f"90{n:07d}",
+        "status": "Suspend 1 month",
+        "client": f"Клиент {n}",
+    }
+    data.update(extra)
+    return Actives.objects.create(**data)
+
+
+def _test_caches() -> dict:
+    """Кэш как в настройках, но файловый — во временном каталоге, а не в кэше разработчика."""
+    default = dict(settings.CACHES["default"])
+    if default["BACKEND"].endswith(".FileBasedCache"):
+        default["LOCATION"] = tempfile.mkdtemp(prefix="crm-test-cache-")
+    return {"default": default}
+
+
+@override_settings(CACHES=_test_caches())
+class CrmTestCase(TestCase):
+    """Каждый тест начинает с пустого кэша: pk в тестовой БД повторяются, а флаги/версии в кэше — нет."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+def no_background_prune(test):
+    """Чистка токенов в фоновом потоке на тестовой БД не нужна (и блокирует sqlite)."""
+    patcher = mock.patch.object(tokens, "maybe_prune_in_background")
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class MoveEngineTests(CrmTestCase):
+    """SQL-движок переноса (INSERT ... SELECT) даёт тот же результат, что и Python-движок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.op1 = User.objects.create(username="op1", first_name="Ali", last_name="Valiev")
+        cls.op2 = User.objects.create(username="op2", fio="Оператор Второй")
+        for n in range(12):
+            make_suspend(
+                n,
+                status_call=["Дозвонился", "Не дозвонился", ""][n % 3] or None,
+                call_result="Ответили на вопрос" if n % 4 == 0 else None,
+                fixed_by=[cls.op1, cls.op2, None][n % 3],
+                fixed_at=BASE_TIME + timedelta(hours=n * 7) if n % 5 else None,
+            )
+        # дубль внутри переноса и дубль к уже существующей записи Fixeds
+        make_suspend(1, status_call="Дозвонился", fixed_by=cls.op1, fixed_at=BASE_TIME + timedelta(hours=7))
+        make_suspend(99, status_call="Дозвонился", fixed_by=cls.op2, fixed_at=BASE_TIME)
+        Fixeds.objects.create(msisdn="998900000099", fixed_by=cls.op2, fixed_at=BASE_TIME, status_call="Дозвонился")
+        make_suspend(100)  # без status_call — не переносится
+
+    def _move(self, engine):
+        sid = transaction.savepoint()
+        moved = move_suspends_with_status_call_to_fixeds(chunk_size=4, ignore_duplicates=True, engine=engine)
+        self.assertFalse(Fixeds.objects.filter(updated_at=None).exists())
+        fixeds = sorted(
+            Fixeds.objects.values_list(*FIXEDS_COPY_FIELDS, "fixed_date"),
+            key=lambda row: tuple(str(v) for v in row),
+        )
+        stats = sorted(OperatorDailyStat.objects.values_list("user_id", "day", "status_call", "call_result", "count"))
+        left = sorted(Suspends.objects.values_list("pk", flat=True))
+        transaction.savepoint_rollback(sid)
+        return moved, fixeds, stats, left
+
+    def test_ignore_conflicts_needs_no_lookup(self):
+        batch = list(Suspends.objects.exclude(status_call=None).order_by("pk"))
+        with transaction.atomic():
+            # INSERT IGNORE + свёртка INSERT ... SELECT + DELETE, без SELECT существующих пар
+            with assert_max_queries(3) as ctx:
+                copy_to_fixeds(batch, ignore_conflicts=True)
+        self.assertFalse(any(q["sql"].startswith("SELECT") for q in ctx.captured_queries))
+        self.assertEqual(Fixeds.objects.count(), 9)
+
+    def test_sql_engine_matches_python_engine(self):
+        python_result = self._move(MOVE_ENGINE_PYTHON)
+        sql_result = self._move(MOVE_ENGINE_SQL)
+        self.assertEqual(python_result, sql_result)
+
+        moved, fixeds, stats, left = sql_result
+        self.assertEqual(moved, 10)
+        self.assertEqual(len(fixeds), 1 + 8)  # существующая + перенесённые без двух дублей
+        self.assertEqual(len(left), 5)  # четыре без status_call + 100
+        # свёртка учитывает только реально вставленные строки: у всех строк Fixeds есть fixed_by
+        self.assertEqual(sum(row[-1] for row in stats), len(fixeds))
+
+
+class TokenRefreshClaimsTests(CrmTestCase):
+    """Claims нового access-токена берутся из БД, а не из refresh-токена."""
+
+    def setUp(self):
+        super().setUp()
+        no_background_prune(self)
+        self.user = User.objects.create(username="boss", is_staff=True, is_superuser=True)
+        self.refresh = str(MyTokenObtainPairSerializer.get_token(self.user))
+        self.client = APIClient()
+
+    def _refresh(self):
+        return self.client.post(reverse("token_refresh"), {"refresh": self.refresh}, format="json")
+
+    def test_revoked_flags_are_not_reissued(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False, is_superuser=False)
+        response = self._refresh()
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data["access"])
+        self.assertFalse(access["is_staff"])
+        self.assertFalse(access["is_superuser"])
+
+    def test_deleted_user_cannot_refresh(self):
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self._refresh().status_code, 401)
+
+
+class BlacklistIndexTests(CrmTestCase):
+    """Отзыв, записанный только в БД (bulk_create, без сигнала и без поколения в кэше), не пропускается."""
+
+    def setUp(self):
+        super().setUp()
+        no_background_prune(self)
+        patcher = mock.patch.object(tokens, "blacklist_index", tokens.BlacklistIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username="op")
+        self.refresh = CrmRefreshToken.for_user(self.user)
+        self.jti = self.refresh["jti"]
+        self.assertFalse(tokens.is_blacklisted(self.jti))  # индекс уже загружен
+
+    def _blacklist_in_db(self):
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=self.jti))])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_local_cache_rereads_db(self):
+        self.assertFalse(tokens.cache_is_shared())
+        self._blacklist_in_db()
+        response = APIClient().post(reverse("token_refresh"), {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_shared_cache_resyncs_without_generation_bump(self):
+        self.assertTrue(tokens.cache_is_shared())
+        self._blacklist_in_db()
+        self.assertFalse(tokens.is_blacklisted(self.jti))  # до интервала — из памяти
+        with mock.patch.object(tokens, "BLACKLIST_RESYNC_EVERY", 0):
+            self.assertTrue(tokens.is_blacklisted(self.jti))
+
+
+USER_SELECT = re.compile(r"\bFROM\W+crm_api_user\W")
+LIST_QUERY_BUDGET = 4  # ETag + count + страница; у search-all — count и выборка по двум таблицам
+
+
+class ListQueryCountTests(CrmTestCase):
+    """Списки: число запросов не растёт с размером страницы и укладывается в бюджет."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+        ops = [User.objects.create(username=f"op{n}", fio=f"Оператор {n}") for n in range(3)]
+        cls.operator = ops[0]
+        for n in range(6):
+            make_suspend(n, status_call="Дозвонился", fixed_by=ops[n % 3], fixed_at=BASE_TIME + timedelta(hours=n))
+            make_suspend(100 + n, status="Active", fixed_by=ops[n % 3])
+            Fixeds.objects.create(
+                msisdn=f"99891{n:07d}", status_call="Дозвонился", fixed_by=ops[n % 3], fixed_at=BASE_TIME,
+            )
+
+    def test_list_endpoints_have_no_n_plus_one(self):
+        for label, view, path in LIST_ENDPOINTS:
+            with self.subTest(label):
+                counts = assert_constant_queries(view, path, self.admin, (1, 6))
+                self.assertLessEqual(counts[0], LIST_QUERY_BUDGET)
+
+    def test_token_requests_do_not_load_user(self):
+        # DjangoModelPermissions на GET спрашивает has_perms([]) — это не повод читать crm_api_user
+        for user in (self.admin, self.operator):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {MyTokenObtainPairSerializer.get_token(user).access_token}")
+            for path in ("/api/actives/", "/api/suspends/", "/api/fixeds/"):
+                with self.subTest(user=user.username, path=path):
+                    with assert_max_queries(LIST_QUERY_BUDGET) as ctx:
+                        response = client.get(path)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertFalse([q["sql"] for q in ctx.captured_queries if USER_SELECT.search(q["sql"])])
+
+    def test_projected_list_within_budget(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with assert_max_queries(LIST_QUERY_BUDGET):
+            response = client.get("/api/fixeds/", {"select": "msisdn,fixed_by_label", "page_size": 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data["results"][0]), {"id", "msisdn", "fixed_by_label"})
+        self.assertTrue(response.data["results"][0]["fixed_by_label"])
+
+
+class SuspendsFixationTests(CrmTestCase):
+    """Фиксация Suspends: дубли (msisdn, fixed_at) не дают 500."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="boss", is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_with_repeated_msisdn_is_rejected(self):
+        first, second, other = make_suspend(1), make_suspend(1, status="Suspend 3 months"), make_suspend(3)
+        response = self.client.post(
+            "/api/suspends/fixation/bulk/",
+            [{"id": pk, "status_call": "Дозвонился"} for pk in (first.pk, second.pk, other.pk)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual(response.data["detail"], DUPLICATE_FIXED_MESSAGE)
+        self.assertEqual(response.data["duplicate_ids"], sorted([first.pk, second.pk]))
+        # пачка не применена ни частично, ни целиком
+        self.assertEqual(Suspends.objects.filter(pk__in=[first.pk, second.pk, other.pk]).count(), 3)
+        self.assertFalse(Fixeds.objects.exists())
+
+    def test_single_conflicting_with_existing_fixed(self):
+        obj = make_suspend(2)
+        Fixeds.objects.create(msisdn=obj.msisdn, fixed_by=self.user, fixed_at=BASE_TIME)
+        with mock.patch("crm_api.services.fixation.timezone.now", return_value=BASE_TIME):
+            response = self.client.patch(f"/api/suspends/{obj.pk}/fixation/", {"status_call": "Дозвонился"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Suspends.objects.filter(pk=obj.pk).exists())
+
+
+class FixedsETagTests(CrmTestCase):
+    """Любая правка Fixeds (не только через API) меняет ETag списка: updated_at — auto_now."""
+
+    def test_edit_invalidates_list_etag(self):
+        user = User.objects.create(username="boss", is_superuser=True)
+        fixed = Fixeds.objects.create(msisdn="998900000001", fixed_by=user, fixed_at=BASE_TIME)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        etag = client.get("/api/fixeds/")["ETag"]
+        self.assertEqual(client.get("/api/fixeds/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        fixed.note = "перезвонить"
+        fixed.save()  # как из админки, мимо FixedsSerializer
+        self.assertEqual(client.get("/api/fixeds/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CacheSettingsTests(SimpleTestCase):
+    """Настройки проекта как есть: кэш общий для воркеров, кэши токенов и прав включены."""
+
+    def test_configured_cache_is_shared(self):
+        self.assertTrue(tokens.cache_is_shared())
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def test_gzip_stream_flushes_every_chunk(self):
+        chunks = [b'{"id": 1, "note": "' + b"x" * 200 + b'"}\n', b'{"id": 2}\n']
+        request = RequestFactory().get("/api/export/", HTTP_ACCEPT_ENCODING="gzip")
+        with mock.patch("crm_api.middleware.brotli", None):
+            middleware = CompressionMiddleware(lambda r: StreamingHttpResponse(iter(chunks), content_type="application/json"))
+            response = middleware(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        parts = iter(response.streaming_content)
+        decoder = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        header, first = next(parts), next(parts)
+        # первый чанк целиком доступен клиенту до того, как сгенерирован второй
+        self.assertEqual(decoder.decompress(header + first), chunks[0])
+        self.assertEqual(decoder.decompress(b"".join(parts)), chunks[1])
+
+
+class PhoneIndexTests(CrmTestCase):
+    """resolve-msisdn не отдаёт номера строк, которые удалили или вывели из Suspends."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="boss", is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deleted, self.activated = make_suspend(1), make_suspend(2)
+
+    def _resolve(self):
+        response = self.client.post(
+            "/api/resolve-msisdn/", {"numbers": [self.deleted.phone, self.activated.phone]}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return [row["msisdn"] for row in response.data]
+
+    def test_delete_and_status_change_through_api(self):
+        self.assertEqual(self._resolve(), [self.deleted.msisdn, self.activated.msisdn])  # индекс прогрет
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/suspends/{self.deleted.pk}/").status_code, 204)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/suspends/{self.activated.pk}/", {"status": "Active"}, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.deleted.phone_norm, phone_index)  # сброшены сразу, без перепроверки
+        self.assertNotIn(self.activated.phone_norm, phone_index)
+        self.assertEqual(self._resolve(), [None, None])
+
+    def test_changes_without_invalidation_are_rechecked(self):
+        self.assertEqual(self._resolve(), [self.deleted.msisdn, self.activated.msisdn])
+        # мимо ORM-сигналов и on_commit: сброса в индексе нет, выручает перепроверка по pk
+        Actives.objects.filter(pk=self.deleted.pk).delete()
+        Actives.objects.filter(pk=self.activated.pk).update(status="Active", status_category=STATUS_CATEGORY_ACTIVE)
+        self.assertEqual(self._resolve(), [None, None])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_local_cache_goes_to_db(self):
+        self.assertEqual(self._resolve(), [self.deleted.msisdn, self.activated.msisdn])
+        Actives.objects.filter(pk=self.deleted.pk).delete()
+        with assert_max_queries(1):
+            self.assertEqual(self._resolve(), [None, self.activated.msisdn])
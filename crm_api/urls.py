@@ -22,9 +22,14 @@ urlpatterns = [
     path("export/fixeds/daily/", export_fixeds_daily, name="export_fixeds_daily"),
     path("export/fixeds/monthly/", export_fixeds_monthly, name="export_fixeds_monthly"),
     path("maintenance/move-suspends/", MoveSuspendsToFixedsAPIView.as_view(), name="maintenance-move-suspends"),
+    path("maintenance/move-suspends/<int:job_id>/", MoveJobStatusView.as_view(), name="maintenance-move-suspends-status"),
     path("resolve-msisdn/", resolve_msisdn, name="resolve-msisdn"),
+    path("resolve-msisdn/bulk/", BulkResolveMsisdnView.as_view(), name="resolve-msisdn-bulk"),
+    path("resolve-msisdn/cache/", PhoneIndexStatsView.as_view(), name="resolve-msisdn-cache"),
     path("operator/statistics/", OperatorStatisticsAPIView.as_view(), name="operator_statistics"),
     path("stats/general/", OperatorStatisticsAPIView.as_view(), name="stats_general"),
     path("stats/daily/", OperatorDailyStatsAPIView.as_view(), name="stats_daily"),
+    path("stats/team/", TeamStatisticsAPIView.as_view(), name="stats_team"),
+    path("analytics/funnel/", FunnelAnalyticsAPIView.as_view(), name="analytics_funnel"),
 
 ]
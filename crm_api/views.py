@@ -3,35 +3,44 @@ import threading
 
 
 from django.contrib.admin.views.decorators import staff_member_required
-from django.conf import settings
 from django.utils import timezone
+from django.db import IntegrityError
 from django.db.models import Q
 import sys
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import csv
-from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+import json
+from collections import Counter
+from rest_framework.parsers import JSONParser
 from rest_framework_simplejwt.views import TokenVerifyView
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from rest_framework_simplejwt.backends import TokenBackend
-from django.db.models.functions import TruncDate
 from .services import *
 from .models import *
 from .serializers import *
 import openpyxl
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from datetime import datetime, date, time, timedelta
 from rest_framework.decorators import api_view
-from django.db.models import Count
 
 from .services.excel_importer import run_import
+from .services.phones import normalize_phone, is_full_number
+from .services.msisdn import iter_resolved, read_numbers_csv, phone_index
+from .services.fixation import bulk_fix_actives, bulk_fix_suspends, fix_suspend, MissingRecords, DuplicateRecords
+from .services.work_queue import claim_next, release_claims
+from .services.mover import run_move_job, find_resumable_job, is_running as is_move_running
+from .services.operator_stats import operator_summary, operator_daily
+from .services.team_stats import team_stats, MAX_RANGE_DAYS
+from .services.analytics import funnel_report
+from .services.tokens import verified_tokens, TokenInvalid
+from .auth import CrmRefreshToken
+from .conditional import ConditionalGetMixin, conditional, row_etag
 
 ORDERABLE = {
     "id", "created_at", "updated_at", "msisdn", "client", "rate_plan",
@@ -46,6 +55,12 @@ ALLOWED_SEARCH_FIELDS = {
     "account": "account__icontains",
 }
 
+# полный номер ищем точным совпадением по нормализованной колонке (индекс), а не icontains
+EXACT_SEARCH_FIELDS = {
+    "msisdn": "msisdn_norm",
+    "phone": "phone_norm",
+}
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 50
@@ -57,6 +72,20 @@ def _change_perm_code():
     return f"{Actives._meta.app_label}.change_{Actives._meta.model_name}"
 
 
+def _check_change_perm(user):
+    perm_code = _change_perm_code()
+    if not (user.is_superuser or user.has_perm(perm_code)):
+        raise PermissionDenied(f"Недостаточно прав: требуется '{perm_code}'.")
+
+
+def _bulk_fixation_items(request):
+    """Список фиксаций: [...] или {"items": [...]}."""
+    data = request.data if isinstance(request.data, list) else request.data.get("items")
+    ser = FixationBulkSerializer(data={"items": data})
+    ser.is_valid(raise_exception=True)
+    return ser.validated_data["items"]
+
+
 def _parse_search_fields(request) -> list[str]:
     raw = request.query_params.getlist("fields") or request.query_params.get("fields")
     if isinstance(raw, str):
@@ -72,21 +101,37 @@ def _parse_search_fields(request) -> list[str]:
     return cleaned
 
 
+def _parse_select(request, allowed) -> list[str] | None:
+    """?select=id,msisdn,... — какие поля отдать в списке (fields уже занят под поля поиска); id всегда."""
+    raw = request.query_params.get("select")
+    if not raw:
+        return None
+    wanted = {p.strip() for p in raw.split(",")} & set(allowed)
+    return ["id", *wanted] if wanted else None
+
+
+def _search_condition(field: str, q: str) -> Q:
+    norm_field = EXACT_SEARCH_FIELDS.get(field)
+    if norm_field:
+        norm = normalize_phone(q)
+        if is_full_number(norm):
+            return Q(**{norm_field: norm})
+    return Q(**{ALLOWED_SEARCH_FIELDS[field]: q})
+
+
 def _apply_filters(request, qs):
     q = (request.query_params.get("q") or "").strip()
     fields = _parse_search_fields(request)
 
     if q:
-        if fields:
-            cond = Q()
-            for f in fields:
-                cond |= Q(**{ALLOWED_SEARCH_FIELDS[f]: q})
-            qs = qs.filter(cond)
-        else:
-            cond = Q()
-            for lookup in ALLOWED_SEARCH_FIELDS.values():
-                cond |= Q(**{lookup: q})
-            qs = qs.filter(cond)
+        if not fields:
+            # все колонки: длинная строка цифр может быть и номером, и лицевым счётом/ИНН клиента;
+            # msisdn/phone для полного номера всё равно ищутся точным совпадением по *_norm
+            fields = list(ALLOWED_SEARCH_FIELDS)
+        cond = Q()
+        for f in fields:
+            cond |= _search_condition(f, q)
+        qs = qs.filter(cond)
 
     ordering = request.query_params.get("ordering")
     if ordering:
@@ -97,9 +142,26 @@ def _apply_filters(request, qs):
 
 
 
-class ActivesViewSet(viewsets.ModelViewSet):
-    queryset = Actives.objects.all().order_by("-created_at")
+class FastListMixin:
+    """list — через values() и RowMapper; retrieve/create/update — обычные сериализаторы."""
+    row_mapper = None
+
+    def list(self, request, *args, **kwargs):
+        mapper = self.row_mapper
+        select = _parse_select(request, mapper.fields)
+        if select:
+            mapper = mapper.project(select)
+        qs = mapper.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(qs)
+        if page is None:
+            return Response(mapper.map(qs))
+        return self.get_paginated_response(mapper.map(page))
+
+
+class ActivesViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Actives.objects.select_related("fixed_by").order_by("-created_at")
     serializer_class = ActivesSerializer
+    row_mapper = ACTIVES_ROWS
     permission_classes = [permissions.IsAuthenticated, DjangoModelPermissions]
     pagination_class = StandardResultsSetPagination
 
@@ -107,19 +169,21 @@ class ActivesViewSet(viewsets.ModelViewSet):
         qs = super().get_queryset()
         status_filter = self.request.query_params.get("status")
         if status_filter:
-            qs = qs.filter(status__icontains=status_filter)
+            category = classify_status(status_filter)
+            if category == STATUS_CATEGORY_OTHER:
+                qs = qs.filter(status__icontains=status_filter)
+            else:
+                qs = qs.filter(status_category=category)
         return _apply_filters(self.request, qs)
 
     @action(detail=True, methods=["get", "patch"], url_path="fixation")
     def fixation(self, request, pk=None):
-        abonent = self.get_object()
-
         if request.method == "GET":
-            return Response(ActivesSerializer(abonent).data, status=status.HTTP_200_OK)
+            return conditional(request, row_etag(request, self.get_queryset(), pk),
+                               lambda: Response(ActivesSerializer(self.get_object()).data, status=status.HTTP_200_OK))
 
-        perm_code = _change_perm_code()
-        if not (request.user.is_superuser or request.user.has_perm(perm_code)):
-            raise PermissionDenied(f"Недостаточно прав: требуется '{perm_code}'.")
+        abonent = self.get_object()
+        _check_change_perm(request.user)
 
         ser = ActivesFixationWriteSerializer(abonent, data=request.data, partial=True)
         ser.is_valid(raise_exception=True)
@@ -130,10 +194,22 @@ class ActivesViewSet(viewsets.ModelViewSet):
         abonent.save(update_fields=["fixed_by", "fixed_at", "updated_at"])
         return Response(ActivesSerializer(abonent).data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["post"], url_path="fixation/bulk",
+            permission_classes=[permissions.IsAuthenticated])
+    def fixation_bulk(self, request):
+        _check_change_perm(request.user)
+        items = _bulk_fixation_items(request)
+        try:
+            objs = bulk_fix_actives(items, request.user)
+        except MissingRecords as e:
+            return Response({"detail": str(e), "missing_ids": e.ids}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"updated": len(objs), "ids": [o.pk for o in objs]}, status=status.HTTP_200_OK)
 
-class SuspendsViewSet(viewsets.ModelViewSet):
-    queryset = Suspends.objects.all().order_by("-created_at")
+
+class SuspendsViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Suspends.objects.select_related("fixed_by").order_by("-created_at")
     serializer_class = ActivesSerializer
+    row_mapper = ACTIVES_ROWS
     permission_classes = [permissions.IsAuthenticated, DjangoModelPermissions]
     pagination_class = StandardResultsSetPagination
 
@@ -143,53 +219,55 @@ class SuspendsViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["get", "patch"], url_path="fixation")
     def fixation(self, request, pk=None):
-        abonent = self.get_object()
-
         if request.method == "GET":
-            return Response(ActivesSerializer(abonent).data, status=status.HTTP_200_OK)
+            return conditional(request, row_etag(request, self.get_queryset(), pk),
+                               lambda: Response(ActivesSerializer(self.get_object()).data, status=status.HTTP_200_OK))
 
-        perm_code = _change_perm_code()
-        if not (request.user.is_superuser or request.user.has_perm(perm_code)):
-            raise PermissionDenied(f"Недостаточно прав: требуется '{perm_code}'.")
+        _check_change_perm(request.user)
 
-        ser = ActivesFixationWriteSerializer(abonent, data=request.data, partial=True)
+        ser = ActivesFixationWriteSerializer(data=request.data, partial=True)
         ser.is_valid(raise_exception=True)
 
-        with transaction.atomic():
-            for f, v in ser.validated_data.items():
-                setattr(abonent, f, v)
-            abonent.fixed_by = request.user
-            abonent.fixed_at = timezone.now()
-            abonent.save()
-
-            fixed = Fixeds.objects.create(
-                msisdn=abonent.msisdn,
-                departments=abonent.departments,
-                status_from=abonent.status_from,
-                days_in_status=abonent.days_in_status,
-                write_offs_date=abonent.write_offs_date,
-                client=abonent.client,
-                rate_plan=abonent.rate_plan,
-                balance=abonent.balance,
-                subscription_fee=abonent.subscription_fee,
-                account=abonent.account,
-                branches=abonent.branches,
-                status=abonent.status,
-                phone=abonent.phone,
-                status_call=abonent.status_call,
-                call_result=abonent.call_result,
-                abonent_answer=abonent.abonent_answer,
-                note=abonent.note,
-                tech=abonent.tech,
-                fixed_by=abonent.fixed_by,
-                fixed_at=abonent.fixed_at,
-                created_at=abonent.created_at,
-                updated_at=abonent.updated_at,
-            )
+        try:
+            fixed = fix_suspend(pk, ser.validated_data, request.user)
+        except IntegrityError:
+            return Response({"detail": DUPLICATE_FIXED_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(FixedsSerializer(fixed).data, status=status.HTTP_201_CREATED)
 
-            abonent.delete()
+    @action(detail=False, methods=["post"], url_path="fixation/bulk",
+            permission_classes=[permissions.IsAuthenticated])
+    def fixation_bulk(self, request):
+        _check_change_perm(request.user)
+        items = _bulk_fixation_items(request)
+        try:
+            ids = bulk_fix_suspends(items, request.user)
+        except MissingRecords as e:
+            return Response({"detail": str(e), "missing_ids": e.ids}, status=status.HTTP_400_BAD_REQUEST)
+        except DuplicateRecords as e:
+            return Response({"detail": DUPLICATE_FIXED_MESSAGE, "duplicate_ids": e.ids}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response({"detail": DUPLICATE_FIXED_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"moved": len(ids), "ids": ids}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"], url_path="next", url_name="next",
+            permission_classes=[permissions.IsAuthenticated])
+    def claim_next(self, request):
+        """Очередь обзвона: забрать следующие необзвоненные записи (?count=&order=branch|days&branch=)."""
+        _check_change_perm(request.user)
+        params = ClaimNextSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        objs = claim_next(
+            request.user,
+            count=params.validated_data["count"],
+            order=params.validated_data.get("order") or None,
+            branch=params.validated_data.get("branch") or None,
+        )
+        return Response(ActivesSerializer(objs, many=True).data, status=status.HTTP_200_OK)
 
-        return Response(FixedsSerializer(fixed).data, status=status.HTTP_201_CREATED)
+    @action(detail=False, methods=["post"], url_path="release",
+            permission_classes=[permissions.IsAuthenticated])
+    def release(self, request):
+        return Response({"released": release_claims(request.user)}, status=status.HTTP_200_OK)
 
 
 class ExcelUploadViewSet(viewsets.ModelViewSet):
@@ -222,7 +300,7 @@ class LogoutView(APIView):
         if not refresh:
             return Response({"detail": "Field 'refresh' is required."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh)
+            token = CrmRefreshToken(refresh)
             token.blacklist()
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -238,30 +316,10 @@ class MyTokenVerifyView(TokenVerifyView):
             return Response({"detail": "Field 'token' is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            UntypedToken(token_str)
-        except (InvalidToken, TokenError):
+            payload, user_info = verified_tokens.verify(token_str)
+        except TokenInvalid:
             return Response({"detail": "Token is invalid or expired.", "code": "token_not_valid"}, status=401)
 
-        backend = TokenBackend(
-            algorithm=getattr(settings, "SIMPLE_JWT", {}).get("ALGORITHM", "HS256"),
-            signing_key=getattr(settings, "SIMPLE_JWT", {}).get("SIGNING_KEY", settings.SECRET_KEY),
-            verifying_key=getattr(settings, "SIMPLE_JWT", {}).get("VERIFYING_KEY", None),
-            audience=getattr(settings, "SIMPLE_JWT", {}).get("AUDIENCE", None),
-            issuer=getattr(settings, "SIMPLE_JWT", {}).get("ISSUER", None),
-            jwk_url=getattr(settings, "SIMPLE_JWT", {}).get("JWK_URL", None),
-            leeway=getattr(settings, "SIMPLE_JWT", {}).get("LEEWAY", 0),
-        )
-        payload = backend.decode(token_str, verify=True)
-
-        user_info = None
-        uid = payload.get("user_id") or payload.get("user") or payload.get("sub")
-        if uid:
-            try:
-                u = User.objects.only("id", "username", "first_name", "last_name", "email").get(pk=uid)
-                user_info = MeSerializer(u).data
-            except User.DoesNotExist:
-                user_info = None
-
         return Response({"valid": True, "payload": payload, "user": user_info}, status=status.HTTP_200_OK)
 
 def _fmt_local(dt, fmt="%Y-%m-%d %H:%M:%S") -> str:
@@ -291,7 +349,7 @@ def export_all_suspends(request):
         "Дата обзвона","Оператор"
     ])
 
-    for obj in Suspends.objects.all():
+    for obj in Suspends.objects.select_related("fixed_by"):
         created_at_str = _fmt_local(obj.created_at)
         fixed_at_str   = _fmt_local(obj.fixed_at)
 
@@ -334,7 +392,7 @@ def export_all_actives(request):
         "Дата обзвона"
     ])
 
-    for obj in Actives.objects.all():
+    for obj in Actives.objects.select_related("fixed_by"):
         created_at_str = _fmt_local(obj.created_at)
         fixed_at_str   = _fmt_local(obj.fixed_at)
 
@@ -440,9 +498,10 @@ class ImportStatusView(APIView):
         data = UploadJobSerializer(job).data
         return Response(data, status=status.HTTP_200_OK)
 
-class FixedsViewSet(viewsets.ModelViewSet):
-    queryset = Fixeds.objects.all()
+class FixedsViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Fixeds.objects.select_related("fixed_by")
     serializer_class = FixedsSerializer
+    row_mapper = FIXEDS_ROWS
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['client', 'account', 'msisdn', 'phone']
     search_param = 'q'
@@ -477,49 +536,26 @@ class SearchSuspendsFixeds(APIView):
         total = qs_s_base.count() + qs_f_base.count()
         need = page * page_size
 
-        qs_s = qs_s_base.order_by(ordering)[:need]
-        qs_f = qs_f_base.order_by(ordering)[:need]
+        mapper = SEARCH_ROWS
+        select = _parse_select(request, mapper.fields)
+        if select:
+            mapper = mapper.project(select)
+        qs_s = mapper.values(qs_s_base.order_by(ordering), fld)[:need]
+        qs_f = mapper.values(qs_f_base.order_by(ordering), fld)[:need]
 
-        def sort_key(o):
-            v = getattr(o, fld, None)
+        def sort_key(row):
+            v = row[fld]
             return (v is None, v)
 
-        merged = [("suspends", o) for o in qs_s] + [("fixeds", o) for o in qs_f]
+        merged = [("suspends", r) for r in qs_s] + [("fixeds", r) for r in qs_f]
         merged.sort(key=lambda t: sort_key(t[1]), reverse=reverse)
 
         start, end = (page - 1) * page_size, (page - 1) * page_size + page_size
         page_slice = merged[start:end]
 
-        def norm(src, obj):
-            return {
-                "id": obj.id,
-                "msisdn": obj.msisdn,
-                "departments": obj.departments,
-                "status_from": obj.status_from,
-                "days_in_status": obj.days_in_status,
-                "write_offs_date": obj.write_offs_date,
-                "client": obj.client,
-                "rate_plan": obj.rate_plan,
-                "balance": obj.balance,
-                "subscription_fee": obj.subscription_fee,
-                "account": obj.account,
-                "branches": obj.branches,
-                "status": obj.status,
-                "phone": obj.phone,
-                "status_call": obj.status_call,
-                "call_result": obj.call_result,
-                "abonent_answer": obj.abonent_answer,
-                "note": obj.note,
-                "tech": obj.tech,
-                "called_by_id": getattr(obj, "fixed_by_id", None),
-                "called_by": obj.who_called if hasattr(obj, "who_called") else "",
-                "called_at": getattr(obj, "fixed_at", None),
-                "created_at": getattr(obj, "created_at", None),
-                "updated_at": getattr(obj, "updated_at", None),
-                "source": src,
-            }
-
-        results = [norm(src, obj) for src, obj in page_slice]
+        results = mapper.map(row for _, row in page_slice)
+        for item, (src, _) in zip(results, page_slice):
+            item["source"] = src
         return Response({"count": total, "next": None, "previous": None, "results": results}, status=status.HTTP_200_OK)
 
 
@@ -589,7 +625,7 @@ def _xlsx_response(wb, filename: str):
 def export_all_fixeds(request):
     wb = openpyxl.Workbook()
     ws = wb.active
-    _write_fixeds_sheet(ws, Fixeds.objects.all().order_by("fixed_at", "id"))
+    _write_fixeds_sheet(ws, Fixeds.objects.select_related("fixed_by").order_by("fixed_at", "id"))
     return _xlsx_response(wb, "fixeds_all.xlsx")
 
 
@@ -605,6 +641,7 @@ def export_fixeds_daily(request):
 
     start, end = _day_range(d)
     qs = (Fixeds.objects
+          .select_related("fixed_by")
           .filter(fixed_at__gte=start, fixed_at__lt=end)
           .exclude(fixed_at__isnull=True)
           .order_by("fixed_at", "id"))
@@ -628,6 +665,7 @@ def export_fixeds_monthly(request):
 
     start, end = _month_range(y, m)
     qs = (Fixeds.objects
+          .select_related("fixed_by")
           .filter(fixed_at__gte=start, fixed_at__lt=end)
           .exclude(fixed_at__isnull=True)
           .order_by("fixed_at", "id"))
@@ -639,20 +677,39 @@ def export_fixeds_monthly(request):
 
 
 class MoveSuspendsToFixedsAPIView(APIView):
+    """Запускает перенос в фоне; незавершённая (упавшая) задача продолжается с last_pk."""
     permission_classes = [IsAdminUser]
+
     def post(self, request, *args, **kwargs):
-        from .models import move_suspends_with_status_call_to_fixeds
-        with transaction.atomic():
-            result = move_suspends_with_status_call_to_fixeds()
-        payload = {"detail": "Move job finished"}
-        if isinstance(result, dict):
-            payload.update(result)
-        elif isinstance(result, (list, tuple)):
-            payload["result"] = list(result)
-        elif isinstance(result, int):
-            payload["moved"] = result
+        running = is_move_running()
+        if running:
+            return Response({"detail": "Move job already running", "job_id": running.id},
+                            status=status.HTTP_409_CONFLICT)
+
+        job = find_resumable_job()
+        resumed = job is not None
+        if job is None:
+            job = MoveJob.objects.create(created_by=request.user, status="pending")
 
-        return Response(payload, status=status.HTTP_200_OK)
+        t = threading.Thread(target=run_move_job, args=(job.id,), daemon=True)
+        t.start()
+
+        return Response({
+            "detail": "Move job resumed" if resumed else "Move job started",
+            "job_id": job.id,
+            "last_pk": job.last_pk,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class MoveJobStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id: int, *args, **kwargs):
+        try:
+            job = MoveJob.objects.get(id=job_id)
+        except MoveJob.DoesNotExist:
+            return Response({"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(MoveJobSerializer(job).data, status=status.HTTP_200_OK)
 
 
 @api_view(["POST"])
@@ -661,72 +718,118 @@ def resolve_msisdn(request):
     Принимает список номеров, возвращает соответствующие MSISDN.
     """
     numbers = request.data.get("numbers", [])
-    result = []
-    for num in numbers:
-        # ищем запись в Suspends по номеру (phone)
-        rec = Suspends.objects.filter(phone=num).first()
-        if rec and rec.msisdn:
-            result.append({"number": num, "msisdn": rec.msisdn})
-        else:
-            result.append({"number": num, "msisdn": None})
+    result = [{"number": num, "msisdn": msisdn} for num, _, msisdn in iter_resolved(numbers)]
     return Response(result)
 
 
-class OperatorStatisticsAPIView(APIView):
+class BulkResolveMsisdnView(APIView):
+    """
+    Массовый resolve для дайлера: JSON-массив номеров ({"numbers": [...]} или просто [...])
+    либо CSV в поле 'file'. Ответ стримится: results, not_found, duplicates.
+    """
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
     permission_classes = [IsAuthenticated]
+    flush_every = 1000
+
+    def post(self, request, *args, **kwargs):
+        f = request.FILES.get("file")
+        if f:
+            numbers = read_numbers_csv(f)
+        elif isinstance(request.data, list):
+            numbers = request.data
+        else:
+            numbers = request.data.get("numbers", [])
+        if not isinstance(numbers, list):
+            return Response({"detail": "Ожидается список номеров."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resp = StreamingHttpResponse(self._stream(numbers), content_type="application/json; charset=utf-8")
+        resp["X-Numbers-Count"] = str(len(numbers))
+        return resp
+
+    def _stream(self, numbers):
+        counts = Counter()
+        not_found = []
+        buf = []
+        yield '{"results":['
+        sep = ""
+        for num, norm, msisdn in iter_resolved(numbers):
+            counts[norm or str(num)] += 1
+            if msisdn is None and counts[norm or str(num)] == 1:
+                not_found.append(num)
+            buf.append(sep + json.dumps({"number": num, "msisdn": msisdn}, ensure_ascii=False))
+            sep = ","
+            if len(buf) >= self.flush_every:
+                yield "".join(buf)
+                buf.clear()
+        if buf:
+            yield "".join(buf)
+        duplicates = [{"number": n, "count": c} for n, c in counts.items() if c > 1]
+        yield "],"
+        yield '"count":' + json.dumps(len(numbers)) + ","
+        yield '"not_found":' + json.dumps(not_found, ensure_ascii=False) + ","
+        yield '"duplicates":' + json.dumps(duplicates, ensure_ascii=False) + "}"
+
+
+class PhoneIndexStatsView(APIView):
+    """Состояние кэша phone -> msisdn: записи, память, hit/miss."""
+    permission_classes = [IsAdminUser]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        now = timezone.now()
-
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_start = today_start - timedelta(days=today_start.weekday())  # понедельник
-        month_start = today_start.replace(day=1)
-
-        qs = Fixeds.objects.filter(fixed_by=user)
-
-        stats = {
-            "today": qs.filter(fixed_at__gte=today_start).count(),
-            "week": qs.filter(fixed_at__gte=week_start).count(),
-            "month": qs.filter(fixed_at__gte=month_start).count(),
-            "total": qs.count(),
-        }
-
-        status_stats = (
-            qs.values("status_call")
-              .annotate(count=Count("id"))
-              .order_by()
-        )
+        return Response(phone_index.stats(), status=status.HTTP_200_OK)
 
-        status_dict = {row["status_call"] or "не указано": row["count"] for row in status_stats}
 
-        return Response({
-            "general": stats,
-            "by_status_call": status_dict
-        }, status=status.HTTP_200_OK)
+class OperatorStatisticsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def get(self, request, *args, **kwargs):
+        return Response(operator_summary(request.user.pk), status=status.HTTP_200_OK)
 
 
 class OperatorDailyStatsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        now = timezone.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        qs = (
-            Fixeds.objects
-            .filter(fixed_by=user, fixed_at__gte=month_start)
-            .annotate(day=TruncDate("fixed_at"))
-            .values("day")
-            .annotate(count=Count("id"))
-            .order_by("day")
-        )
+        date_from, date_to = _parse_date_range(request)
+        branch = (request.GET.get("branch") or "").strip() or None
+        data = operator_daily(request.user.pk, date_from, date_to, branch=branch)
+        return Response(data, status=status.HTTP_200_OK)
 
-        data = [
-            {"date": row["day"].strftime("%Y-%m-%d"), "count": row["count"]}
-            for row in qs
-        ]
 
-        return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
+def _parse_date_range(request):
+    """?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD; по умолчанию — с начала месяца по сегодня."""
+    today = timezone.now().date()
+    try:
+        date_from = datetime.strptime(request.GET["date_from"], "%Y-%m-%d").date() \
+            if request.GET.get("date_from") else today.replace(day=1)
+        date_to = datetime.strptime(request.GET["date_to"], "%Y-%m-%d").date() \
+            if request.GET.get("date_to") else today
+    except ValueError:
+        raise ValidationError({"detail": "Bad date format, use YYYY-MM-DD"})
+    if date_from > date_to:
+        raise ValidationError({"detail": "date_from must not be after date_to"})
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise ValidationError({"detail": f"Range is limited to {MAX_RANGE_DAYS} days"})
+    return date_from, date_to
+
+
+class TeamStatisticsAPIView(APIView):
+    """Сводка по всем операторам за период: лидерборд, матрицы по дням/status_call, филиалы."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        date_from, date_to = _parse_date_range(request)
+        return Response(team_stats(date_from, date_to), status=status.HTTP_200_OK)
+
+
+class FunnelAnalyticsAPIView(APIView):
+    """Воронка call_result -> abonent_answer -> реактивация и когорты; только по ночному снимку."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        report = funnel_report()
+        if report is None:
+            return Response(
+                {"detail": "Snapshot not built yet: run manage.py build_analytics_snapshot."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(report, status=status.HTTP_200_OK)